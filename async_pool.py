@@ -0,0 +1,153 @@
+import asyncio
+import inspect
+import itertools
+import time
+
+from thread_pool import ThreadPool, TaskPriority, _run_chunk
+
+
+def wrap_future(future, loop=None):
+    """Return an asyncio.Future that settles when the pool Future does.
+
+    Cancelling the asyncio side cancels the pool task if it has not started.
+    """
+    loop = loop or asyncio.get_running_loop()
+    afut = loop.create_future()
+
+    def _copy(f):
+        if afut.done():
+            return
+        if f.cancelled():
+            afut.cancel()
+        elif f.exception() is not None:
+            afut.set_exception(f.exception())
+        else:
+            afut.set_result(f.result())
+
+    def _done(f):
+        try:
+            loop.call_soon_threadsafe(_copy, f)
+        except RuntimeError:
+            pass                          # event loop already closed
+
+    def _cancelled(a):
+        if a.cancelled():
+            future.cancel()
+
+    afut.add_done_callback(_cancelled)
+    future.add_done_callback(_done)
+    return afut
+
+
+async def amap(pool, fn, iterable, chunksize=1, priority=TaskPriority.MEDIUM, max_in_flight=None):
+    """Yield fn(item) for every item as chunks finish, without blocking the loop."""
+    if chunksize < 1:
+        raise ValueError("chunksize must be >= 1")
+    if max_in_flight is None:
+        max_in_flight = 2 * pool.num_threads
+    max_in_flight = max(1, max_in_flight)
+
+    items = iter(iterable)
+    pending = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                chunk = list(itertools.islice(items, chunksize))
+                if not chunk:
+                    exhausted = True
+                    break
+                pending.add(wrap_future(pool.submit(priority, _run_chunk, fn, chunk)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for f in done:
+                for result in f.result():
+                    yield result
+    finally:
+        for f in pending:
+            f.cancel()
+
+
+class AsyncWorkerPool(ThreadPool):
+    """ThreadPool whose workers each run an asyncio event loop.
+
+    Coroutine functions (or functions returning an awaitable) submitted with
+    the usual submit(priority, fn, *args) are taken from the shared
+    TaskPriority queue and run concurrently on a worker's loop, up to
+    max_concurrency per worker, so I/O-bound tasks do not each hold an OS
+    thread. Plain functions still work but block their worker's loop while
+    they run. Workers are not retired by autoscaling in this mode.
+    """
+
+    def __init__(self, num_threads=2, max_concurrency=1000, **kwargs):
+        self.max_concurrency = max_concurrency
+        self._wakers = {}                 # worker id -> thread-safe wake-up callable
+        super().__init__(num_threads=num_threads, **kwargs)
+
+    def _wake_workers(self, n):
+        super()._wake_workers(n)
+        for wake in list(self._wakers.values()):
+            wake()
+
+    def _worker_loop(self, slot):
+        asyncio.run(self._event_loop_worker(slot))
+
+    async def _event_loop_worker(self, slot):
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def waker():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+        self._wakers[slot.worker_id] = waker
+        running = set()
+        try:
+            while True:
+                wake.clear()
+                with self.work_ready:
+                    if (self.stopped and not self.tasks and not self.tenants.parked
+                            and not self._retrying and not running):
+                        break
+                    free = self.max_concurrency - len(running)
+                    if self.paused and not self.stopped:
+                        batch, expired = [], []
+                    else:
+                        batch, expired = self._take_batch_locked(free)
+                    throttled = self._throttle_timeout_locked()
+                if expired:
+                    self._expire(expired)
+                for task in batch:
+                    if self._on_dequeue:
+                        self._emit(self._on_dequeue, task)
+                    running.add(loop.create_task(self._run_async_task(task, slot)))
+
+                waiter = loop.create_task(wake.wait())
+                done, _ = await asyncio.wait(running | {waiter}, timeout=throttled,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                running -= done
+                if not running:
+                    slot.current = None
+        finally:
+            self._wakers.pop(slot.worker_id, None)
+
+    async def _run_async_task(self, task, slot):
+        start_time = time.time()
+        with self.lock:
+            self.active_tasks += 1
+        slot.show(task.priority, task.args[0] if task.args else None, task.token)
+        if self._on_start:
+            self._emit(self._on_start, task)
+        t0 = time.perf_counter()
+        try:
+            result = task.fn(*task.args)
+            if inspect.isawaitable(result):
+                result = await result
+            ok, value = True, result
+        except Exception as e:
+            ok, value = False, e
+        self._finish_task(task, ok, value, start_time, time.perf_counter() - t0)
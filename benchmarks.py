@@ -0,0 +1,786 @@
+# Headless micro-benchmarks for ThreadPool.  Run:  python benchmarks.py [name ...]
+import contextlib
+import io
+import os
+import sys
+import time
+import threading
+
+from thread_pool import ThreadPool, TaskPriority
+
+
+def _noop():
+    return None
+
+
+def _noop_arg(_):
+    return None
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+# ---------------- wake-up / idle ----------------
+def bench_resume_latency(rounds=200, num_threads=4):
+    """Time from resume() until a queued task starts running."""
+    pool = ThreadPool(num_threads=num_threads)
+    started = threading.Event()
+    stamp = []
+
+    def probe():
+        stamp.append(time.perf_counter())
+        started.set()
+
+    samples = []
+    for _ in range(rounds):
+        pool.pause()
+        started.clear()
+        stamp.clear()
+        pool.submit(TaskPriority.HIGH, probe)
+        time.sleep(0.001)               # let workers go back to sleep
+        t0 = time.perf_counter()
+        pool.resume()
+        started.wait(5)
+        samples.append((stamp[0] - t0) * 1e6)
+    pool.shutdown()
+    return {
+        "rounds": rounds,
+        "p50_us": round(_percentile(samples, 50), 1),
+        "p99_us": round(_percentile(samples, 99), 1),
+        "max_us": round(max(samples), 1),
+    }
+
+
+def bench_idle_cpu(num_threads=200, seconds=2.0):
+    """Process CPU time burned while num_threads workers sit idle."""
+    pool = ThreadPool(num_threads=num_threads)
+    time.sleep(0.2)                     # let every worker reach its wait
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    pool.shutdown()
+    return {
+        "threads": num_threads,
+        "cpu_seconds": round(cpu, 4),
+        "cpu_percent": round(100 * cpu / wall, 3),
+    }
+
+
+# ---------------- history memory ----------------
+def bench_history_memory(rounds=5, tasks_per_round=20_000):
+    """Traced memory after each round of completed tasks should stay flat."""
+    import tracemalloc
+
+    pool = ThreadPool(num_threads=4)
+    tracemalloc.start()
+    samples = []
+    for _ in range(rounds):
+        futures = [pool.submit(TaskPriority.LOW, _noop) for _ in range(tasks_per_round)]
+        for f in futures:
+            f.result()
+        del futures
+        samples.append(round(tracemalloc.get_traced_memory()[0] / 1024))
+    tracemalloc.stop()
+    summary = pool.stats.summary()["LOW"]
+    pool.shutdown()
+    return {
+        "kib_after_each_round": samples,
+        "run_p99_us": round(summary["run_p99"] * 1e6, 1),
+        "wait_p99_ms": round(summary["wait_p99"] * 1e3, 2),
+    }
+
+
+# ---------------- queue edits ----------------
+def bench_queue_edits(pending=1_000_000, edits=10_000):
+    """Cost of cancel / set_priority / clear with a very large backlog."""
+    import random
+
+    pool = ThreadPool(num_threads=1)
+    pool.pause()
+    priorities = list(TaskPriority)
+    t0 = time.perf_counter()
+    futures = [pool.submit(priorities[i % 3], len, ()) for i in range(pending)]
+    submit_s = time.perf_counter() - t0
+
+    sample = random.sample(futures, 2 * edits)
+    t0 = time.perf_counter()
+    for f in sample[:edits]:
+        pool.cancel(f)
+    cancel_us = (time.perf_counter() - t0) / edits * 1e6
+
+    t0 = time.perf_counter()
+    for f in sample[edits:]:
+        pool.set_priority(f, random.choice(priorities))
+    reprioritize_us = (time.perf_counter() - t0) / edits * 1e6
+
+    t0 = time.perf_counter()
+    pool.clear_queue()
+    clear_ms = (time.perf_counter() - t0) * 1e3
+    pool.resume()
+    pool.shutdown()
+    return {
+        "pending": pending,
+        "submit_per_s": round(pending / submit_s),
+        "cancel_us": round(cancel_us, 2),
+        "set_priority_us": round(reprioritize_us, 2),
+        "clear_queue_ms": round(clear_ms, 1),
+    }
+
+
+# ---------------- batch submission ----------------
+def bench_submit_many(tasks=100_000):
+    """Enqueue cost of a submit() loop vs one submit_many() call (pool paused)."""
+    results = {}
+    for name in ("submit_loop", "submit_many"):
+        pool = ThreadPool(num_threads=4)
+        pool.pause()
+        args = [(i,) for i in range(tasks)]
+        t0 = time.perf_counter()
+        if name == "submit_loop":
+            for a in args:
+                pool.submit(TaskPriority.MEDIUM, _noop_arg, *a)
+        else:
+            pool.submit_many(TaskPriority.MEDIUM, _noop_arg, args)
+        elapsed = time.perf_counter() - t0
+        pool.clear_queue()
+        pool.resume()
+        pool.shutdown()
+        results[name] = {"seconds": round(elapsed, 3), "tasks_per_s": round(tasks / elapsed)}
+    results["speedup"] = round(results["submit_loop"]["seconds"] / results["submit_many"]["seconds"], 2)
+    return results
+
+
+# ---------------- work stealing ----------------
+def _fan_out(pool, depth):
+    # Each task spawns two children from inside the pool (nested submission)
+    if depth:
+        pool.submit(TaskPriority.MEDIUM, _fan_out, pool, depth - 1)
+        pool.submit(TaskPriority.MEDIUM, _fan_out, pool, depth - 1)
+
+
+def _drain(pool, expected, timeout=120):
+    end = time.perf_counter() + timeout
+    while pool.completed_tasks < expected and time.perf_counter() < end:
+        time.sleep(0.001)
+
+
+def bench_work_stealing(tasks=100_000, depth=15, num_threads=4):
+    """Tasks/s for microsecond tasks: shared-queue ThreadPool vs WorkStealingPool."""
+    from work_stealing import WorkStealingPool
+
+    results = {}
+    for name, cls in (("thread_pool", ThreadPool), ("work_stealing", WorkStealingPool)):
+        pool = cls(num_threads=num_threads)
+        t0 = time.perf_counter()
+        for _ in range(tasks):
+            pool.submit(TaskPriority.MEDIUM, _noop)
+        _drain(pool, tasks)
+        external = tasks / (time.perf_counter() - t0)
+
+        nested_total = 2 ** (depth + 1) - 1
+        base = pool.completed_tasks
+        t0 = time.perf_counter()
+        pool.submit(TaskPriority.MEDIUM, _fan_out, pool, depth)
+        _drain(pool, base + nested_total)
+        nested = nested_total / (time.perf_counter() - t0)
+        pool.shutdown()
+        results[name] = {"external_tasks_per_s": round(external), "nested_tasks_per_s": round(nested)}
+    return results
+
+
+# ---------------- scheduling policies ----------------
+def bench_scheduling(tasks=100_000, utilization=0.97, seed=7):
+    """Discrete-event simulation of one worker under mixed load.
+
+    Arrivals are Poisson, HIGH/MEDIUM/LOW carry 60/25/15% of the work and
+    every task gets a per-class deadline. Reports queue-wait p50/p99 (in
+    service-time units) per class for each scheduling policy.
+    """
+    import random
+    from futures import Future
+    from scheduling import make_scheduler
+    from task_queue import Task
+
+    rng = random.Random(seed)
+    mix = [(TaskPriority.HIGH, 0.60, 20.0), (TaskPriority.MEDIUM, 0.25, 50.0), (TaskPriority.LOW, 0.15, 200.0)]
+    now = 0.0
+    arrivals = []
+    for seq in range(tasks):
+        now += rng.expovariate(utilization)
+        r = rng.random()
+        for priority, share, budget in mix:
+            if r < share:
+                break
+            r -= share
+        arrivals.append((now, seq, priority, budget, rng.expovariate(1.0)))
+
+    clock = [0.0]
+    options = {"aging": {"aging_interval": 25.0}, "wfq": {}}
+    results = {}
+    for name in ("strict", "aging", "wfq", "edf"):
+        opts = dict(options.get(name, {}))
+        if name in ("aging", "wfq"):
+            opts["clock"] = lambda: clock[0]
+        queue = make_scheduler(name, TaskPriority, **opts)
+        waits = {p: [] for p in TaskPriority}
+        missed = {p: 0 for p in TaskPriority}
+        i = 0
+        clock[0] = 0.0
+        while i < len(arrivals) or queue:
+            if not queue:
+                clock[0] = max(clock[0], arrivals[i][0])
+            while i < len(arrivals) and arrivals[i][0] <= clock[0]:
+                at, seq, priority, budget, service = arrivals[i]
+                task = Task(priority, seq, None, (service,), Future(), at, at + budget)
+                queue.push(task)
+                i += 1
+            task = queue.pop()
+            waits[task.priority].append(clock[0] - task.submitted)
+            clock[0] += task.args[0]
+            if clock[0] > task.deadline:
+                missed[task.priority] += 1
+        results[name] = {
+            p.name: {
+                "p50": round(_percentile(w, 50), 1),
+                "p99": round(_percentile(w, 99), 1),
+                "missed_deadline_pct": round(100 * missed[p] / max(1, len(w)), 1),
+            }
+            for p, w in waits.items()
+        }
+    return results
+
+
+# ---------------- tenants ----------------
+def bench_tenants(noisy_tasks=2000, quiet_tasks=100, num_threads=4, work=0.002):
+    """Latency of a light tenant while a noisy tenant's backlog is queued,
+    with and without a concurrency cap on the noisy tenant."""
+    results = {}
+    for name, limits in (("unlimited", None), ("capped", {"noisy": {"max_concurrent": num_threads // 2}})):
+        pool = ThreadPool(num_threads=num_threads, tenant_limits=limits)
+        pool.submit_many(TaskPriority.MEDIUM, time.sleep, [(work,)] * noisy_tasks, tenant="noisy")
+        latencies = []
+        quiet = []
+        for _ in range(quiet_tasks):
+            f = pool.submit(TaskPriority.MEDIUM, time.sleep, work, tenant="quiet")
+            t0 = time.perf_counter()
+            f.add_done_callback(lambda f, t0=t0: latencies.append(time.perf_counter() - t0))
+            quiet.append(f)
+            time.sleep(work)
+        for f in quiet:
+            f.result()
+        pool.shutdown()
+        results[name] = {
+            "quiet_p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+            "quiet_p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "noisy_throttled": pool.tenants.snapshot()["noisy"]["throttled_concurrency"],
+        }
+    return results
+
+
+# ---------------- durability ----------------
+def bench_durable(tasks=2000, producers=8):
+    """Enqueue throughput with the write-ahead log off vs on (pool paused).
+
+    "loop" is one producer calling submit() (one fsync per task), "threads"
+    is several producers whose records share fsyncs (group commit) and
+    "batch" is a single submit_many().
+    """
+    import tempfile
+    from tasks import cpu_bound_task
+
+    def loop(pool):
+        for i in range(tasks):
+            pool.submit(TaskPriority.MEDIUM, cpu_bound_task, i)
+
+    def threads(pool):
+        per = tasks // producers
+        ts = [threading.Thread(target=lambda: [pool.submit(TaskPriority.MEDIUM, cpu_bound_task, i)
+                                               for i in range(per)])
+              for _ in range(producers)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+
+    def batch(pool):
+        pool.submit_many(TaskPriority.MEDIUM, cpu_bound_task, [(i,) for i in range(tasks)])
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for durable in (False, True):
+            for name, run in (("loop", loop), ("threads", threads), ("batch", batch)):
+                path = os.path.join(tmp, f"{name}.wal") if durable else None
+                pool = ThreadPool(num_threads=2, durable=path)
+                pool.pause()
+                t0 = time.perf_counter()
+                run(pool)
+                elapsed = time.perf_counter() - t0
+                entry = {"tasks_per_s": round(tasks / elapsed)}
+                if durable:
+                    entry["fsyncs"] = pool.wal.fsyncs
+                pool.clear_queue()
+                pool.resume()
+                pool.shutdown()
+                results[f"{'durable' if durable else 'memory'}_{name}"] = entry
+    return results
+
+
+# ---------------- result cache ----------------
+def bench_result_cache(tasks=2000, distinct=50, num_threads=4, work=0.002):
+    """Duplicate-heavy load (tasks submissions over distinct values) with
+    the result cache off and on."""
+    import random
+
+    values = [random.Random(i).randrange(distinct) for i in range(tasks)]
+    results = {}
+    for name, cache in (("off", None), ("on", True)):
+        pool = ThreadPool(num_threads=num_threads, result_cache=cache)
+        t0 = time.perf_counter()
+        for f in [pool.submit(TaskPriority.MEDIUM, time.sleep, work * (1 + v / distinct)) for v in values]:
+            f.result()
+        elapsed = time.perf_counter() - t0
+        pool.shutdown()
+        results[name] = {"seconds": round(elapsed, 3), "executed": pool.completed_tasks}
+        if pool.result_cache is not None:
+            results[name].update(pool.result_cache.stats())
+    return results
+
+
+# ---------------- hooks / tracing ----------------
+def bench_hooks(tasks=50_000, num_threads=4):
+    """No-op task throughput with no hooks, empty hooks and a TraceRecorder."""
+    from thread_pool import HOOK_EVENTS
+    from tracing import TraceRecorder
+
+    def empty(*_):
+        pass
+
+    results = {}
+    for name in ("none", "empty_hooks", "trace_recorder"):
+        pool = ThreadPool(num_threads=num_threads)
+        if name == "empty_hooks":
+            for event in HOOK_EVENTS:
+                pool.add_hook(event, empty)
+        elif name == "trace_recorder":
+            TraceRecorder(pool)
+        t0 = time.perf_counter()
+        for f in pool.submit_many(TaskPriority.MEDIUM, _noop, [()] * tasks):
+            f.result()
+        elapsed = time.perf_counter() - t0
+        pool.shutdown()
+        results[name] = {"tasks_per_s": round(tasks / elapsed)}
+    return results
+
+
+# ---------------- UI refresh ----------------
+def bench_ui_refresh(sizes=(1_000, 10_000, 100_000), rows=50, rounds=20):
+    """Data-side cost of one dashboard tick with a paused, growing queue:
+    the old full get_queue_items() copy rendered to text versus
+    changes(top_n=rows) (Tk itself is not involved)."""
+    results = {}
+    for size in sizes:
+        pool = ThreadPool(num_threads=1)
+        pool.pause()
+        pool.submit_many(TaskPriority.MEDIUM, _noop, [(i,) for i in range(size)])
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            "".join(f"{args[0]} ({TaskPriority(p).name})\n" for p, _, args in pool.get_queue_items())
+        full = (time.perf_counter() - t0) / rounds
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            changes = pool.changes(0, top_n=rows)
+            "".join(f"{args[0]} ({TaskPriority(p).name})\n" for p, _, args in changes["top"])
+        top = (time.perf_counter() - t0) / rounds
+        pool.clear_queue()
+        pool.resume()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pool.shutdown()
+        results[size] = {"full_copy_ms": round(full * 1e3, 3), "changes_top_ms": round(top * 1e3, 3)}
+    return results
+
+# ---------------- retries ----------------
+def _flaky_sleep(state, fails, backoff):
+    # Fails `fails` times; with backoff set it retries inline, holding the worker
+    while True:
+        state[0] += 1
+        if state[0] > fails:
+            return
+        if not backoff:
+            raise ConnectionError("transient")
+        time.sleep(backoff * 2 ** (state[0] - 1))
+
+
+def bench_retries(flaky=40, fails=2, healthy=2000, num_threads=4, backoff=0.05):
+    """Throughput of healthy no-op tasks while flaky tasks back off: with
+    the backoff slept inside the task (holding a worker) versus a
+    RetryPolicy on the pool's delay queue."""
+    from retry import RetryPolicy
+
+    results = {}
+    for name in ("sleep_in_worker", "delay_queue"):
+        inline = name == "sleep_in_worker"
+        policy = RetryPolicy(max_attempts=fails + 1, backoff=backoff, jitter=0)
+        pool = ThreadPool(num_threads=num_threads, retry=None if inline else policy)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            flaky_futures = [pool.submit(TaskPriority.HIGH, _flaky_sleep, [0], fails, backoff if inline else 0)
+                             for _ in range(flaky)]
+            for f in pool.submit_many(TaskPriority.MEDIUM, _noop, [()] * healthy):
+                f.result()
+            healthy_done = time.perf_counter() - t0
+            for f in flaky_futures:
+                f.result()
+            elapsed = time.perf_counter() - t0
+            pool.shutdown()
+        results[name] = {"healthy_seconds": round(healthy_done, 3), "total_seconds": round(elapsed, 3),
+                         "retried": pool.retried_tasks, "succeeded": pool.succeeded_tasks}
+    return results
+
+# ---------------- distributed ----------------
+def bench_distributed(tasks=400, work=0.01, threads_per_node=2, lease=1.0):
+    """Sleep-task throughput through a Coordinator with 1 and 2 local worker
+    processes, then with one of two nodes killed mid-run: how long the run
+    takes and how many tasks were redelivered."""
+    from distributed import LocalCluster
+
+    results = {}
+    for name, nodes, kill in (("1_node", 1, False), ("2_nodes", 2, False), ("2_nodes_kill_one", 2, True)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cluster = LocalCluster(nodes=nodes, threads_per_node=threads_per_node, lease_seconds=lease,
+                                   heartbeat_interval=lease / 4)
+            # wait for the nodes to register so process start-up is not timed
+            while len(cluster.coordinator.nodes()) < nodes:
+                time.sleep(0.01)
+            t0 = time.perf_counter()
+            futures = [cluster.submit(TaskPriority.MEDIUM, time.sleep, work) for _ in range(tasks)]
+            if kill:
+                futures[tasks // 4].result()
+                cluster.kill_node(0)
+            for f in futures:
+                f.result()
+            elapsed = time.perf_counter() - t0
+            snap = cluster.coordinator.snapshot()
+            cluster.shutdown()
+        results[name] = {"seconds": round(elapsed, 3), "tasks_per_s": round(tasks / elapsed),
+                         "redelivered": snap["redelivered"], "duplicates": snap["duplicates"]}
+    return results
+
+
+# ---------------- pool comparison ----------------
+class _Subject:
+    """Uniform submit / shutdown over the pools being compared."""
+
+    def __init__(self, name, factory, priorities):
+        self.name = name
+        self.factory = factory
+        self.priorities = priorities      # HIGH, MEDIUM, LOW, or None without priorities
+
+    def start(self, num_threads):
+        return self.factory(num_threads)
+
+    def submit(self, pool, level, fn, *args):
+        if self.priorities is None:
+            return pool.submit(fn, *args)
+        return pool.submit(self.priorities[level], fn, *args)
+
+    def shutdown(self, pool):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if self.priorities is None:
+                pool.shutdown(wait=True)
+            else:
+                pool.shutdown()
+
+
+def _subjects():
+    import concurrent.futures
+    import task
+
+    return [
+        _Subject("task.py", lambda n: task.ThreadPool(num_threads=n), list(task.TaskPriority)),
+        _Subject("thread_pool.py", lambda n: ThreadPool(num_threads=n), list(TaskPriority)),
+        _Subject("concurrent.futures",
+                 lambda n: concurrent.futures.ThreadPoolExecutor(max_workers=n), None),
+    ]
+
+
+def _sleep_1ms():
+    time.sleep(0.001)
+
+
+def _spin(n=2000):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+# workload name -> (tasks per run, fn(i) -> (priority level 0-2, fn, args))
+_WORKLOADS = {
+    "noop": (20_000, lambda i: (1, _noop, ())),
+    "sleep": (2_000, lambda i: (1, _sleep_1ms, ())),
+    "cpu": (5_000, lambda i: (1, _spin, ())),
+    "mixed": (5_000, lambda i: (i % 3, (_noop, _sleep_1ms, _spin)[i % 3], ())),
+}
+
+
+def _run_workload(subject, num_threads, tasks, make):
+    pool = subject.start(num_threads)
+    done = [0.0] * tasks
+    submitted = [0.0] * tasks
+    levels = [0] * tasks
+
+    def finished(i):
+        return lambda f: done.__setitem__(i, time.perf_counter())
+
+    t0 = time.perf_counter()
+    futures = []
+    for i in range(tasks):
+        level, fn, args = make(i)
+        levels[i] = level
+        submitted[i] = time.perf_counter()
+        f = subject.submit(pool, level, fn, *args)
+        f.add_done_callback(finished(i))
+        futures.append(f)
+    submit_s = time.perf_counter() - t0
+    for f in futures:
+        f.result()
+    total_s = time.perf_counter() - t0
+    subject.shutdown(pool)
+
+    latencies = [d - s for d, s in zip(done, submitted)]
+    out = {
+        "submit_per_s": round(tasks / submit_s),
+        "throughput_per_s": round(tasks / total_s),
+        "e2e_p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "e2e_p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+    }
+    if len(set(levels)) > 1:
+        for level, label in enumerate(("high", "medium", "low")):
+            mine = [lat for lat, lv in zip(latencies, levels) if lv == level]
+            out[f"e2e_p99_ms_{label}"] = round(_percentile(mine, 99) * 1000, 3)
+    return out
+
+
+def _dispatch_latency(subject, num_threads, rounds=300):
+    # One task at a time on an idle pool: submit() -> task starts running
+    pool = subject.start(num_threads)
+    time.sleep(0.05)
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        started = subject.submit(pool, 1, time.perf_counter).result()
+        samples.append(started - t0)
+    subject.shutdown(pool)
+    return {
+        "dispatch_p50_us": round(_percentile(samples, 50) * 1e6, 1),
+        "dispatch_p99_us": round(_percentile(samples, 99) * 1e6, 1),
+    }
+
+
+def _idle_cpu(subject, num_threads, seconds=0.5):
+    pool = subject.start(num_threads)
+    if subject.priorities is None:
+        # ThreadPoolExecutor starts workers lazily
+        for f in [pool.submit(_sleep_1ms) for _ in range(num_threads)]:
+            f.result()
+    time.sleep(0.1)
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    subject.shutdown(pool)
+    return {"idle_cpu_percent": round(100 * cpu / wall, 3)}
+
+
+def _memory_per_task(subject, num_threads, queued=10_000):
+    # Occupy every worker, then measure what queued tasks cost
+    import tracemalloc
+
+    pool = subject.start(num_threads)
+    gate = threading.Event()
+    started = threading.Semaphore(0)
+
+    def blocker():
+        started.release()
+        gate.wait()
+
+    blockers = [subject.submit(pool, 0, blocker) for _ in range(num_threads)]
+    for _ in range(num_threads):
+        started.acquire()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    futures = [subject.submit(pool, 2, _noop_arg, i) for i in range(queued)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gate.set()
+    for f in blockers + futures:
+        f.result()
+    subject.shutdown(pool)
+    return {"bytes_per_queued_task": round((after - before) / queued)}
+
+
+def bench_compare(thread_counts=(1, 4, 16), scale=1.0):
+    """task.py vs thread_pool.py vs concurrent.futures.ThreadPoolExecutor.
+
+    Results are keyed "pool/workload/threads" so two runs (python
+    benchmarks.py compare --json out.json) can be diffed with --diff.
+    """
+    results = {}
+    for subject in _subjects():
+        for n in thread_counts:
+            for workload, (tasks, make) in _WORKLOADS.items():
+                tasks = max(1, int(tasks * scale))
+                results[f"{subject.name}/{workload}/{n}"] = _run_workload(subject, n, tasks, make)
+            idle = {}
+            idle.update(_dispatch_latency(subject, n, max(10, int(300 * scale))))
+            idle.update(_idle_cpu(subject, n))
+            idle.update(_memory_per_task(subject, n, max(100, int(10_000 * scale))))
+            results[f"{subject.name}/idle/{n}"] = idle
+    return results
+
+
+# ---------------- process backend ----------------
+def bench_process_scaling(tasks=64, work=200_000, max_workers=None):
+    """Throughput of a CPU-bound task on the process backend vs worker count."""
+    from tasks import cpu_bound_task
+
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = sorted({n for n in (1, 2, 4, max_workers) if n <= max_workers})
+    results = {}
+    base = None
+    for n in counts:
+        pool = ThreadPool(num_threads=n, backend="process")
+        # warm up: start every worker process before timing
+        for f in pool.submit_many(TaskPriority.HIGH, cpu_bound_task, [(1,)] * (4 * n)):
+            f.result()
+        t0 = time.perf_counter()
+        # one burst with the default batch_size: it must still spread over every process
+        futures = pool.submit_many(TaskPriority.MEDIUM, cpu_bound_task, [(work,)] * tasks)
+        for f in futures:
+            f.result()
+        elapsed = time.perf_counter() - t0
+        pool.shutdown()
+        base = base or elapsed
+        results[n] = {"seconds": round(elapsed, 3), "speedup": round(base / elapsed, 2)}
+
+    # Same workload on threads for reference (GIL-bound)
+    pool = ThreadPool(num_threads=max_workers)
+    t0 = time.perf_counter()
+    for f in [pool.submit(TaskPriority.MEDIUM, cpu_bound_task, work) for _ in range(tasks)]:
+        f.result()
+    results["threads"] = {"seconds": round(time.perf_counter() - t0, 3)}
+    pool.shutdown()
+    return results
+
+
+BENCHMARKS = {
+    "resume_latency": bench_resume_latency,
+    "idle_cpu": bench_idle_cpu,
+    "history_memory": bench_history_memory,
+    "queue_edits": bench_queue_edits,
+    "submit_many": bench_submit_many,
+    "work_stealing": bench_work_stealing,
+    "scheduling": bench_scheduling,
+    "tenants": bench_tenants,
+    "durable": bench_durable,
+    "result_cache": bench_result_cache,
+    "hooks": bench_hooks,
+    "retries": bench_retries,
+    "ui_refresh": bench_ui_refresh,
+    "distributed": bench_distributed,
+    "process_scaling": bench_process_scaling,
+    "compare": bench_compare,
+}
+
+
+def _environment():
+    import platform
+    import subprocess
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# Metrics where a larger number is better; everything else is a time, size or CPU share
+_HIGHER_IS_BETTER = ("_per_s", "speedup")
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            yield from _flatten(v, f"{prefix}{k}." if prefix or k else prefix)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix.rstrip("."), value
+
+
+def diff_results(old, new, threshold=0.10):
+    """Metrics in new that are more than threshold worse than in old."""
+    before = dict(_flatten(old["results"]))
+    regressions = []
+    for key, value in _flatten(new["results"]):
+        prev = before.get(key)
+        if not prev or not value:
+            continue
+        higher = key.endswith(_HIGHER_IS_BETTER)
+        change = (prev - value) / prev if higher else (value - prev) / prev
+        if change > threshold:
+            regressions.append((key, prev, value, round(100 * change, 1)))
+    return regressions
+
+
+def main(argv):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Headless ThreadPool benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two JSON result files and list regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change counted as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.diff:
+        with open(args.diff[0]) as f:
+            old = json.load(f)
+        with open(args.diff[1]) as f:
+            new = json.load(f)
+        regressions = diff_results(old, new, args.threshold)
+        for key, prev, value, pct in regressions:
+            print(f"REGRESSION {key}: {prev} -> {value} ({pct}% worse)")
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1 if regressions else 0
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    results = {}
+    for name in args.names or list(BENCHMARKS):
+        results[name] = BENCHMARKS[name]()
+        print(f"{name}: {results[name]}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"environment": _environment(), "results": results}, f, indent=1, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
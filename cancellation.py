@@ -0,0 +1,61 @@
+import time
+
+from futures import CancelledError
+from worker_slots import current_handle
+
+
+class TaskCancelled(CancelledError):
+    """Raised by CancelToken.raise_if_cancelled() inside a running task."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Set on a task's Future when its deadline passed before it could start."""
+
+
+class CancelToken:
+    """Cooperative cancellation flag handed to a running task.
+
+    The token counts as cancelled once ThreadPool.cancel() was called on a
+    running task or once the task's deadline has passed. Long-running tasks
+    should check it between steps and return early.
+    """
+
+    __slots__ = ("deadline", "_reason")
+
+    def __init__(self, deadline=None):
+        self.deadline = deadline          # absolute time.time(), or None
+        self._reason = None
+
+    def cancel(self, reason="cancelled"):
+        if self._reason is None:
+            self._reason = reason
+
+    @property
+    def cancelled(self):
+        if self._reason is not None:
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+    @property
+    def reason(self):
+        if self._reason is not None:
+            return self._reason
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "deadline exceeded"
+        return None
+
+    def remaining(self):
+        """Seconds left before the deadline (None without one)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled(self.reason)
+
+
+def current_token():
+    """CancelToken of the task running in this thread, or None."""
+    handle = current_handle()
+    return handle.token if handle is not None else None
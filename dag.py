@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import threading
+
+from futures import Future
+
+
+class Node:
+    """One task in a TaskGraph. Its result is available through node.future."""
+
+    __slots__ = ("fn", "args", "deps", "children", "priority", "cost", "key",
+                 "future", "seq", "waiting", "path")
+
+    def __init__(self, fn, args, deps, priority, cost, key, seq):
+        self.fn = fn
+        self.args = args
+        self.deps = deps                  # upstream nodes, results passed in this order
+        self.children = []
+        self.priority = priority
+        self.cost = cost                  # relative run-time estimate for critical path
+        self.key = key                    # dedupe key, None when args are unhashable
+        self.future = Future()
+        self.seq = seq
+        self.waiting = 0                  # upstream nodes not finished yet
+        self.path = cost                  # longest cost path from here to a sink
+
+    def __repr__(self):
+        return f"<Node {getattr(self.fn, '__name__', self.fn)}{self.args!r}>"
+
+
+class TaskGraph:
+    """Dependency-aware scheduling on top of a ThreadPool.
+
+    Nodes run fn(*upstream_results, *args) as soon as every upstream node has
+    finished. Ready nodes are ordered by TaskPriority, then by critical-path
+    length (longest chain of cost below the node), then by insertion order.
+    At most max_in_flight nodes (default: the pool's max_threads) are handed
+    to the pool at once so that this ordering, not the pool's FIFO tiebreak,
+    decides what runs next.
+    Adding an identical (fn, args, deps) node twice returns the first one.
+    When a node fails, every node downstream of it is cancelled.
+    """
+
+    def __init__(self, pool, max_in_flight=None):
+        self.pool = pool
+        self.max_in_flight = max_in_flight
+        self.nodes = []
+        self._members = set()
+        self._by_key = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = []
+        self._in_flight = 0
+        self._started = False
+        self._done = threading.Event()
+        self._remaining = 0
+        self.deduplicated = 0
+
+    def add(self, priority, fn, *args, deps=(), cost=1.0):
+        if self._started:
+            raise RuntimeError("cannot add nodes after run()")
+        deps = tuple(deps)
+        for d in deps:
+            if d not in self._members:
+                raise ValueError(f"unknown upstream node: {d!r}")
+
+        key = (fn, args, tuple(id(d) for d in deps))
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+        if key is not None and key in self._by_key:
+            node = self._by_key[key]
+            if priority.value < node.priority.value:
+                node.priority = priority
+            self.deduplicated += 1
+            return node
+
+        node = Node(fn, args, deps, priority, cost, key, next(self._seq))
+        for d in deps:
+            d.children.append(node)
+        node.waiting = len(deps)
+        self.nodes.append(node)
+        self._members.add(node)
+        if key is not None:
+            self._by_key[key] = node
+        return node
+
+    # ---------------- running ----------------
+    def run(self):
+        """Start scheduling. Returns self; use wait() or node.future for results."""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+            # Nodes were added after their deps, so reverse order is reverse topological
+            for node in reversed(self.nodes):
+                if node.children:
+                    node.path = node.cost + max(c.path for c in node.children)
+            self._remaining = len(self.nodes)
+            if not self._remaining:
+                self._done.set()
+            for node in self.nodes:
+                if not node.waiting:
+                    self._push_ready(node)
+        self._dispatch()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until every node has finished, failed or been cancelled."""
+        return self._done.wait(timeout)
+
+    def results(self, timeout=None):
+        """{node: result} for all nodes; raises the first failure."""
+        self.run()
+        if not self.wait(timeout):
+            raise TimeoutError("graph did not finish within timeout")
+        return {node: node.future.result() for node in self.nodes}
+
+    def _push_ready(self, node):
+        # Caller holds self._lock
+        heapq.heappush(self._ready, (node.priority.value, -node.path, node.seq, node))
+
+    def _dispatch(self):
+        # max_threads, not the live count: an autoscaling pool only grows once
+        # its queue backs up, which a limit of num_threads would never allow
+        limit = self.max_in_flight or max(
+            1, getattr(self.pool, "max_threads", self.pool.num_threads))
+        to_submit = []
+        with self._lock:
+            while self._ready and self._in_flight < limit:
+                _, _, _, node = heapq.heappop(self._ready)
+                self._in_flight += 1
+                to_submit.append(node)
+        for node in to_submit:
+            inputs = tuple(d.future.result() for d in node.deps)
+            f = self.pool.submit(node.priority, node.fn, *inputs, *node.args)
+            f.add_done_callback(lambda f, node=node: self._on_done(node, f))
+
+    def _on_done(self, node, f):
+        if f.cancelled():
+            node.future.cancel()
+        elif f.exception() is not None:
+            node.future.set_exception(f.exception())
+        else:
+            node.future.set_result(f.result())
+
+        finished = 1
+        with self._lock:
+            self._in_flight -= 1
+            if node.future.cancelled() or node.future.exception() is not None:
+                finished += self._cancel_downstream(node)
+            else:
+                for child in node.children:
+                    child.waiting -= 1
+                    if not child.waiting and not child.future.done():
+                        self._push_ready(child)
+            self._remaining -= finished
+            if self._remaining <= 0:
+                self._done.set()
+        self._dispatch()
+
+    def _cancel_downstream(self, node):
+        # Caller holds self._lock. Returns how many nodes were newly cancelled
+        cancelled = 0
+        stack = list(node.children)
+        while stack:
+            child = stack.pop()
+            if child.future.done():
+                continue
+            child.future.cancel()
+            cancelled += 1
+            stack.extend(child.children)
+        return cancelled
+
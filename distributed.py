@@ -0,0 +1,491 @@
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import socket
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from futures import Future
+from scheduling import make_scheduler
+from task_queue import Task
+from thread_pool import ThreadPool, TaskPriority
+
+
+DEFAULT_AUTHKEY = b"threadpool"
+
+
+class _Lease:
+    __slots__ = ("node_id", "expires", "seconds")
+
+    def __init__(self, node_id, expires, seconds):
+        self.node_id = node_id
+        self.expires = expires
+        self.seconds = seconds
+
+
+class _Broker:
+    """The coordinator side of the wire protocol; its public methods are
+    what worker nodes call through the manager proxy."""
+
+    def __init__(self, coordinator):
+        self._c = coordinator
+
+    def register(self, name, pid, host):
+        return self._c._register(name, pid, host)
+
+    def lease(self, node_id, max_tasks, lease_seconds, wait=0.0):
+        return self._c._lease(node_id, max_tasks, lease_seconds, wait)
+
+    def complete(self, node_id, results):
+        self._c._complete(node_id, results)
+
+    def heartbeat(self, node_id, counters, held):
+        self._c._heartbeat(node_id, counters, held)
+
+
+class Coordinator:
+    """Keeps the TaskPriority queue and hands leased batches to worker nodes.
+
+    Nodes connect over TCP through multiprocessing.managers (see WorkerNode
+    and run_node). A leased task that is not completed before its lease
+    runs out (the node died, hung or lost its connection) goes back on the
+    queue and is delivered again, so tasks run at least once; the first
+    result to arrive resolves the Future and later duplicates are dropped.
+    Nodes renew the leases of tasks they still hold with every heartbeat.
+
+    Tasks travel pickled, so fn must be importable on the nodes (a
+    module-level function) and args picklable; submit() checks this.
+    """
+
+    def __init__(self, address=("127.0.0.1", 0), authkey=DEFAULT_AUTHKEY,
+                 heartbeat_timeout=5.0, scheduler="strict", scheduler_options=None):
+        if isinstance(scheduler, str):
+            scheduler = make_scheduler(scheduler, TaskPriority, **(scheduler_options or {}))
+        self.tasks = scheduler
+        self.heartbeat_timeout = heartbeat_timeout
+        self._lock = threading.Lock()
+        self._work_ready = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+        self._seq = itertools.count(1)
+        self._node_ids = itertools.count(1)
+        self._jobs = {}                   # task id -> (Task, payload), until resolved
+        self._leases = {}                 # task id -> _Lease
+        self._nodes = {}                  # node id -> counters dict
+        self._closed = False
+        self._polling = 0                 # nodes inside a lease() call
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.redelivered = 0
+        self.duplicates = 0
+
+        broker = _Broker(self)
+        manager_cls = type("_CoordinatorManager", (BaseManager,), {})
+        manager_cls.register("broker", callable=lambda: broker)
+        self._manager = manager_cls(address=address, authkey=authkey)
+        self._server = self._manager.get_server()
+        self.address = self._server.address
+        self.authkey = authkey
+        self._thread = threading.Thread(target=self._accept_loop, name="coordinator", daemon=True)
+        self._thread.start()
+
+    def _accept_loop(self):
+        # Server.serve_forever() cannot be stopped from another thread and its
+        # accepter never exits, so connections are accepted here instead
+        server = self._server
+        server.stop_event = threading.Event()
+        while True:
+            try:
+                conn = server.listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            if self._closed:
+                conn.close()
+                return
+            threading.Thread(target=server.handle_request, args=(conn,), daemon=True).start()
+
+    # ---------------- client API ----------------
+    def submit(self, priority, fn, *args):
+        payload = pickle.dumps((fn, args), protocol=pickle.HIGHEST_PROTOCOL)
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("coordinator is shut down")
+            task = Task(priority, next(self._seq), fn, args, future, time.time())
+            future.task = task
+            self._jobs[task.seq] = (task, payload)
+            self.tasks.push(task)
+            self.submitted += 1
+            self._work_ready.notify()
+        return future
+
+    def cancel(self, future):
+        """Cancel a task that no node has leased yet. A task queued again
+        after its lease expired has already started and is not cancelled."""
+        task = future.task
+        if task is None:
+            return False
+        with self._lock:
+            if future.running() or not self.tasks.remove(task):
+                return False
+            del self._jobs[task.seq]
+            future.task = None
+            self._all_done.notify_all()
+        return future.cancel()
+
+    def queue_size(self):
+        return len(self.tasks)
+
+    def nodes(self):
+        """{node id: counters}, with 'alive' from the last heartbeat."""
+        now = time.time()
+        with self._lock:
+            out = {}
+            for node_id, node in self._nodes.items():
+                node = dict(node)
+                node["alive"] = now - node["last_seen"] < self.heartbeat_timeout
+                node["leased_now"] = sum(1 for lease in self._leases.values() if lease.node_id == node_id)
+                out[node_id] = node
+            return out
+
+    def snapshot(self):
+        with self._lock:
+            counters = {
+                "queue_size": len(self.tasks),
+                "leased": len(self._leases),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "redelivered": self.redelivered,
+                "duplicates": self.duplicates,
+            }
+        counters["nodes"] = self.nodes()
+        return counters
+
+    def join(self, timeout=None):
+        """Wait until every submitted task has been resolved."""
+        with self._lock:
+            return self._all_done.wait_for(lambda: not self._jobs, timeout)
+
+    def shutdown(self, wait=True, timeout=5.0):
+        """Stop handing out work (nodes then exit) and close the listener.
+
+        Nodes waiting in lease() are told to exit before this returns (up to
+        timeout seconds); connected nodes keep their connections until then.
+        """
+        if wait:
+            self.join()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._work_ready.notify_all()
+            self._all_done.wait_for(lambda: not self._polling, timeout)
+        # accept() does not notice a close from another thread; wake it with a connection
+        try:
+            socket.create_connection(self.address, timeout=1.0).close()
+        except OSError:
+            pass
+        self._thread.join()
+        self._server.listener.close()
+
+    # ---------------- node side (called through _Broker) ----------------
+    def _register(self, name, pid, host):
+        with self._lock:
+            node_id = next(self._node_ids)
+            self._nodes[node_id] = {"name": name, "pid": pid, "host": host,
+                                    "registered": time.time(), "last_seen": time.time(),
+                                    "leased": 0, "completed": 0, "failed": 0, "expired": 0,
+                                    "reported": {}}
+            return node_id
+
+    def _lease(self, node_id, max_tasks, lease_seconds, wait):
+        """Up to max_tasks (task id, priority value, payload) triples, [] when
+        none arrived within wait seconds, or None once shut down."""
+        with self._lock:
+            self._polling += 1
+        try:
+            return self._lease_batch(node_id, max_tasks, lease_seconds, wait)
+        finally:
+            with self._lock:
+                self._polling -= 1
+                self._all_done.notify_all()
+
+    def _lease_batch(self, node_id, max_tasks, lease_seconds, wait):
+        end = time.time() + wait
+        starting = []
+        with self._lock:
+            self._nodes[node_id]["last_seen"] = time.time()
+            while True:
+                self._reap_locked(time.time())
+                if self._closed:
+                    return None
+                if self.tasks:
+                    break
+                remaining = end - time.time()
+                if remaining <= 0:
+                    return []
+                # wake up for lease expiry even if nothing new is submitted
+                self._work_ready.wait(min(remaining, 0.5))
+            now = time.time()
+            batch = []
+            while self.tasks and len(batch) < max_tasks:
+                task = self.tasks.pop()
+                if task.future.cancelled():
+                    self._jobs.pop(task.seq, None)
+                    continue
+                if not task.future.running():
+                    starting.append(task.future)
+                self._leases[task.seq] = _Lease(node_id, now + lease_seconds, lease_seconds)
+                batch.append((task.seq, task.priority.value, self._jobs[task.seq][1]))
+            self._nodes[node_id]["leased"] += len(batch)
+            self._all_done.notify_all()
+        for future in starting:
+            future.set_running_or_notify_cancel()
+        return batch
+
+    def _reap_locked(self, now):
+        # Put tasks whose lease ran out back on the queue
+        for task_id, lease in list(self._leases.items()):
+            if lease.expires <= now:
+                del self._leases[task_id]
+                job = self._jobs.get(task_id)
+                node = self._nodes.get(lease.node_id)
+                if node is not None:
+                    node["expired"] += 1
+                if job is not None:
+                    self.tasks.push(job[0])
+                    self.redelivered += 1
+                    self._work_ready.notify()
+
+    def _complete(self, node_id, results):
+        resolved = []
+        with self._lock:
+            node = self._nodes[node_id]
+            node["last_seen"] = time.time()
+            for task_id, ok, payload in results:
+                lease = self._leases.get(task_id)
+                if lease is not None and lease.node_id == node_id:
+                    del self._leases[task_id]
+                job = self._jobs.pop(task_id, None)
+                if job is None:
+                    self.duplicates += 1      # already resolved by an earlier delivery
+                    continue
+                task = job[0]
+                self.tasks.remove(task)       # queued again after its lease expired
+                self._leases.pop(task_id, None)
+                task.future.task = None
+                if ok:
+                    self.completed += 1
+                    node["completed"] += 1
+                else:
+                    self.failed += 1
+                    node["failed"] += 1
+                resolved.append((task.future, ok, payload))
+            self._all_done.notify_all()
+        for future, ok, payload in resolved:
+            try:
+                value = pickle.loads(payload)
+            except Exception as e:
+                ok, value = False, e
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _heartbeat(self, node_id, counters, held):
+        now = time.time()
+        with self._lock:
+            node = self._nodes[node_id]
+            node["last_seen"] = now
+            node["reported"] = counters
+            for task_id in held:
+                lease = self._leases.get(task_id)
+                if lease is not None and lease.node_id == node_id:
+                    lease.expires = now + lease.seconds
+
+
+class WorkerNode:
+    """Runs leased tasks from a Coordinator on a local ThreadPool.
+
+    One thread long-polls the coordinator for batches while fewer than
+    max_in_flight tasks are held, one sends results back in batches and one
+    sends heartbeats (counters plus the ids of held tasks, which renews
+    their leases). run() returns when the coordinator shuts down or goes away.
+    """
+
+    def __init__(self, address, authkey=DEFAULT_AUTHKEY, num_threads=4, batch_size=8,
+                 lease_seconds=10.0, heartbeat_interval=1.0, max_in_flight=None, name=None):
+        manager_cls = type("_NodeManager", (BaseManager,), {})
+        manager_cls.register("broker")
+        self._manager = manager_cls(address=tuple(address), authkey=authkey)
+        self._manager.connect()
+        self.broker = self._manager.broker()
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.node_id = self.broker.register(self.name, os.getpid(), socket.gethostname())
+
+        self.pool = ThreadPool(num_threads=num_threads)
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.max_in_flight = max_in_flight or 2 * num_threads
+        self._held = {}                   # task id -> local Future
+        self._room = threading.Semaphore(self.max_in_flight)
+        self._results = queue.SimpleQueue()
+        self._stopped = threading.Event()
+        self.leased = 0
+        self.completed = 0
+        self.failed = 0
+
+    def run(self):
+        threads = [threading.Thread(target=self._report_loop, daemon=True),
+                   threading.Thread(target=self._heartbeat_loop, daemon=True)]
+        for t in threads:
+            t.start()
+        try:
+            self._lease_loop()
+        finally:
+            self._stopped.set()
+            self._results.put(None)
+            for t in threads:
+                t.join()
+            self.pool.shutdown()
+
+    def _lease_loop(self):
+        while not self._stopped.is_set():
+            self._room.acquire()
+            free = 1
+            while free < self.batch_size and self._room.acquire(blocking=False):
+                free += 1
+            try:
+                batch = self.broker.lease(self.node_id, free, self.lease_seconds, 1.0)
+            except (EOFError, OSError):
+                return                    # coordinator went away
+            if batch is None:
+                return                    # coordinator shut down
+            for _ in range(free - len(batch)):
+                self._room.release()
+            self.leased += len(batch)
+            for task_id, priority, payload in batch:
+                self._start(task_id, TaskPriority(priority), payload)
+
+    def _start(self, task_id, priority, payload):
+        try:
+            fn, args = pickle.loads(payload)
+        except Exception as e:
+            self._results.put((task_id, False, e))
+            return
+        f = self.pool.submit(priority, fn, *args)
+        self._held[task_id] = f
+        f.add_done_callback(lambda f: self._results.put((task_id, True, f)))
+
+    def _report_loop(self):
+        while True:
+            item = self._results.get()
+            items = [item]
+            while True:
+                try:
+                    items.append(self._results.get_nowait())
+                except queue.Empty:
+                    break
+            results = []
+            for entry in items:
+                if entry is None:
+                    continue
+                task_id, _, f = entry
+                self._held.pop(task_id, None)
+                self._room.release()
+                if isinstance(f, Exception):
+                    ok, value = False, f
+                elif f.exception() is not None:
+                    ok, value = False, f.exception()
+                else:
+                    ok, value = True, f.result()
+                try:
+                    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                except Exception as e:
+                    ok, payload = False, pickle.dumps(RuntimeError(f"unpicklable result: {e}"))
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                results.append((task_id, ok, payload))
+            if results:
+                try:
+                    self.broker.complete(self.node_id, results)
+                except (EOFError, OSError):
+                    return
+            if None in items:
+                return
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            counters = {
+                "leased": self.leased,
+                "completed": self.completed,
+                "failed": self.failed,
+                "held": len(self._held),
+                "active": self.pool.active_tasks,
+                "threads": self.pool.num_threads,
+            }
+            try:
+                self.broker.heartbeat(self.node_id, counters, list(self._held))
+            except (EOFError, OSError):
+                return
+
+
+def run_node(address, authkey=DEFAULT_AUTHKEY, **options):
+    """Process entry point: serve one coordinator until it shuts down."""
+    WorkerNode(address, authkey, **options).run()
+
+
+class LocalCluster:
+    """A Coordinator plus several local worker processes standing in for nodes.
+
+        with LocalCluster(nodes=3, threads_per_node=2) as cluster:
+            f = cluster.submit(TaskPriority.HIGH, tasks.cpu_bound_task, 10**6)
+    """
+
+    def __init__(self, nodes=2, threads_per_node=2, lease_seconds=10.0, heartbeat_interval=1.0,
+                 mp_context="spawn", **coordinator_options):
+        self.coordinator = Coordinator(**coordinator_options)
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._node_options = {"num_threads": threads_per_node, "lease_seconds": lease_seconds,
+                              "heartbeat_interval": heartbeat_interval}
+        self.processes = []
+        for _ in range(nodes):
+            self.add_node()
+
+    def add_node(self):
+        p = self._ctx.Process(target=run_node, daemon=True,
+                              args=(self.coordinator.address, self.coordinator.authkey),
+                              kwargs=self._node_options)
+        p.start()
+        self.processes.append(p)
+        return p
+
+    def kill_node(self, index):
+        """Hard-kill one node process, as if its host died."""
+        self.processes[index].kill()
+        self.processes[index].join()
+
+    def submit(self, priority, fn, *args):
+        return self.coordinator.submit(priority, fn, *args)
+
+    def shutdown(self, wait=True):
+        self.coordinator.shutdown(wait)
+        for p in self.processes:
+            p.join(5)
+            if p.is_alive():
+                p.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,174 @@
+import threading
+import time
+import queue
+
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+CANCELLED = "CANCELLED"
+FINISHED = "FINISHED"
+
+FIRST_COMPLETED = "FIRST_COMPLETED"
+FIRST_EXCEPTION = "FIRST_EXCEPTION"
+ALL_COMPLETED = "ALL_COMPLETED"
+
+
+class CancelledError(Exception):
+    pass
+
+
+# One lock shared by every future keeps each Future small (no per-future
+# Condition). It is only held for a few attribute writes at a time.
+_lock = threading.Lock()
+
+
+class Future:
+    """Result handle returned by ThreadPool.submit()."""
+
+    __slots__ = ("_state", "_result", "_exception", "_waiters", "_callbacks", "task")
+
+    def __init__(self):
+        self.task = None                  # queued Task, set by the pool until dequeued
+        self._state = PENDING
+        self._result = None
+        self._exception = None
+        self._waiters = None              # Events of threads blocked in result()
+        self._callbacks = None
+
+    def __repr__(self):
+        return f"<Future state={self._state}>"
+
+    # ---------------- state ----------------
+    def done(self):
+        return self._state in (FINISHED, CANCELLED)
+
+    def running(self):
+        return self._state == RUNNING
+
+    def cancelled(self):
+        return self._state == CANCELLED
+
+    def cancel(self):
+        """Cancel the task if it has not started yet."""
+        with _lock:
+            if self._state == CANCELLED:
+                return True
+            if self._state != PENDING:
+                return False
+            self._state = CANCELLED
+        self._wake()
+        return True
+
+    def set_running_or_notify_cancel(self):
+        """Called by a worker right before running. False means skip the task."""
+        with _lock:
+            if self._state == CANCELLED:
+                return False
+            self._state = RUNNING
+            return True
+
+    def set_result(self, result):
+        with _lock:
+            if self._state in (FINISHED, CANCELLED):
+                return
+            self._result = result
+            self._state = FINISHED
+        self._wake()
+
+    def set_exception(self, exception):
+        with _lock:
+            if self._state in (FINISHED, CANCELLED):
+                return
+            self._exception = exception
+            self._state = FINISHED
+        self._wake()
+
+    def _wake(self):
+        with _lock:
+            waiters, self._waiters = self._waiters, None
+            callbacks, self._callbacks = self._callbacks, None
+        if waiters:
+            for ev in waiters:
+                ev.set()
+        if callbacks:
+            for fn in callbacks:
+                self._invoke(fn)
+
+    def _invoke(self, fn):
+        try:
+            fn(self)
+        except Exception as e:
+            print("Future callback error:", e)
+
+    # ---------------- waiting ----------------
+    def _wait(self, timeout):
+        if self.done():
+            return True
+        with _lock:
+            if self.done():
+                return True
+            ev = threading.Event()
+            if self._waiters is None:
+                self._waiters = []
+            self._waiters.append(ev)
+        return ev.wait(timeout)
+
+    def result(self, timeout=None):
+        if not self._wait(timeout):
+            raise TimeoutError("Future not finished within timeout")
+        if self._state == CANCELLED:
+            raise CancelledError()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        if not self._wait(timeout):
+            raise TimeoutError("Future not finished within timeout")
+        if self._state == CANCELLED:
+            raise CancelledError()
+        return self._exception
+
+    def add_done_callback(self, fn):
+        """Call fn(future) once the future is done (immediately if it already is)."""
+        with _lock:
+            if not self.done():
+                if self._callbacks is None:
+                    self._callbacks = []
+                self._callbacks.append(fn)
+                return
+        self._invoke(fn)
+
+
+# ---------------- helpers ----------------
+def as_completed(fs, timeout=None):
+    """Yield futures from fs as they finish."""
+    fs = list(fs)
+    end = None if timeout is None else time.monotonic() + timeout
+    finished = queue.SimpleQueue()
+    for f in fs:
+        f.add_done_callback(finished.put)
+
+    for _ in range(len(fs)):
+        remaining = None if end is None else max(0.0, end - time.monotonic())
+        try:
+            yield finished.get(timeout=remaining)
+        except queue.Empty:
+            raise TimeoutError("Not all futures finished within timeout") from None
+
+
+def wait(fs, timeout=None, return_when=ALL_COMPLETED):
+    """Block until return_when is satisfied. Returns (done, not_done) sets."""
+    fs = set(fs)
+    done = set()
+    try:
+        for f in as_completed(fs, timeout):
+            done.add(f)
+            if return_when == FIRST_COMPLETED:
+                break
+            if return_when == FIRST_EXCEPTION and not f.cancelled() and f.exception() is not None:
+                break
+    except TimeoutError:
+        pass
+    done |= {f for f in fs if f.done()}
+    return done, fs - done
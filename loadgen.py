@@ -0,0 +1,154 @@
+import itertools
+import threading
+import time
+
+from task_stats import LatencyHistogram
+from thread_pool import TaskPriority
+
+
+def _noop():
+    return None
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+# workload name -> work seconds -> (fn, args)
+WORKLOADS = {
+    "noop": lambda work: (_noop, ()),
+    "sleep": lambda work: (_sleep, (work,)),
+    "cpu": lambda work: (_spin, (work,)),
+}
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class LoadGenerator:
+    """Drives a pool open-loop and reports throughput and latency.
+
+    With rate set, tasks are submitted at that many per second (late
+    submissions are caught up, so a slow pool shows up as queueing rather
+    than a lower offered load). With burst set, burst tasks are submitted
+    together every burst_interval seconds. Every report_interval seconds a
+    line with submitted/completed rates, p50/p99 submit-to-done latency,
+    queue size and thread count is passed to out.
+    """
+
+    def __init__(self, pool, fn, args=(), rate=100.0, burst=None, burst_interval=1.0,
+                 priorities=(TaskPriority.MEDIUM,), report_interval=1.0, out=print):
+        self.pool = pool
+        self.fn = fn
+        self.args = tuple(args)
+        self.rate = rate
+        self.burst = burst
+        self.burst_interval = burst_interval
+        self.priorities = itertools.cycle(priorities)
+        self.report_interval = report_interval
+        self.out = out
+
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.histogram = LatencyHistogram()   # every latency, for the final summary
+        self._window = []                 # latencies since the last report
+        self._last = (0.0, 0, 0)          # elapsed, submitted, completed at the last report
+        self._lock = threading.Lock()
+
+    def _done(self, sent):
+        def callback(f):
+            latency = time.perf_counter() - sent
+            with self._lock:
+                self.completed += 1
+                if f.cancelled() or f.exception() is not None:
+                    self.errors += 1
+                self._window.append(latency)
+        return callback
+
+    def _send(self, n):
+        sent = time.perf_counter()
+        callback = self._done(sent)
+        for _ in range(n):
+            f = self.pool.submit(next(self.priorities), self.fn, *self.args)
+            f.add_done_callback(callback)
+        self.submitted += n
+
+    def run(self, duration):
+        """Generate load for duration seconds, then wait for what was sent.
+        Returns the summary dict."""
+        start = time.perf_counter()
+        end = start + duration
+        next_report = start + self.report_interval
+        next_send = start
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            if now >= next_send:
+                if self.burst:
+                    self._send(self.burst)
+                    next_send += self.burst_interval
+                else:
+                    due = int((now - start) * self.rate) + 1 - self.submitted
+                    if due > 0:
+                        self._send(due)
+                    next_send = start + self.submitted / self.rate
+            if now >= next_report:
+                self._report(now - start)
+                next_report += self.report_interval
+            time.sleep(max(0.0, min(next_send, next_report, end) - time.perf_counter()))
+
+        # Drain: keep reporting until every submitted task has finished
+        while True:
+            with self._lock:
+                if self.completed >= self.submitted:
+                    break
+            now = time.perf_counter()
+            if now >= next_report:
+                self._report(now - start)
+                next_report += self.report_interval
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        self._report(elapsed)
+        return self.summary(elapsed)
+
+    def _report(self, elapsed):
+        with self._lock:
+            window, self._window = self._window, []
+            completed = self.completed
+        for latency in window:
+            self.histogram.record(latency)
+        prev_elapsed, prev_sent, prev_done = self._last
+        span = max(1e-9, elapsed - prev_elapsed)
+        self._last = (elapsed, self.submitted, completed)
+        self.out(f"{elapsed:7.1f}s  sent {(self.submitted - prev_sent) / span:8.0f}/s"
+                 f"  done {(completed - prev_done) / span:8.0f}/s"
+                 f"  p50 {_percentile(window, 50) * 1e3:8.2f} ms"
+                 f"  p99 {_percentile(window, 99) * 1e3:8.2f} ms"
+                 f"  queue {self.pool.queue_size():6d}  threads {self.pool.num_threads}")
+
+    def summary(self, elapsed):
+        hist = self.histogram
+        result = {
+            "seconds": round(elapsed, 3),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "errors": self.errors,
+            "throughput_per_s": round(self.completed / elapsed, 1) if elapsed else 0.0,
+            "latency_p50_ms": round(hist.quantile(0.50) * 1e3, 3),
+            "latency_p99_ms": round(hist.quantile(0.99) * 1e3, 3),
+            "latency_max_ms": round(hist.max * 1e3, 3),
+        }
+        self.out("summary: " + "  ".join(f"{k}={v}" for k, v in result.items()))
+        return result
@@ -1,8 +1,189 @@
+import argparse
+import ast
+import sys
 
-from task import ThreadPool
-from ui import ThreadUI
+from thread_pool import ThreadPool, TaskPriority
+from scheduling import SCHEDULERS
 
-if __name__ == "__main__":
-    print("Logging system initialized")  # <--- Add this line
-    pool = ThreadPool(num_threads=1)
+
+def _add_pool_args(parser):
+    parser.add_argument("--threads", type=int, default=None,
+                        help="fixed number of worker threads")
+    parser.add_argument("--min-threads", type=int, default=1,
+                        help="autoscaling lower bound (default 1)")
+    parser.add_argument("--max-threads", type=int, default=8,
+                        help="autoscaling upper bound (default 8); ignored with --threads")
+    parser.add_argument("--scheduler", choices=sorted(SCHEDULERS), default="strict",
+                        help="queue scheduling policy (default strict)")
+    parser.add_argument("--backend", choices=("thread", "process"), default="thread")
+    parser.add_argument("--cache", type=int, default=None, metavar="N",
+                        help="memoize results of identical (task, args), keeping up to N")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics on this port")
+    parser.add_argument("--trace", metavar="PATH", default=None,
+                        help="write a Chrome trace (Perfetto) of every task to PATH on exit")
+
+
+def build_pool(args):
+    options = {"scheduler": args.scheduler, "backend": args.backend}
+    if args.cache is not None:
+        options["result_cache"] = {"max_entries": args.cache}
+    if args.threads is not None:
+        pool = ThreadPool(num_threads=args.threads, **options)
+    else:
+        pool = ThreadPool(min_threads=args.min_threads, max_threads=args.max_threads, **options)
+    extras = {}
+    if args.metrics_port is not None:
+        from metrics import MetricsExporter
+        extras["metrics"] = MetricsExporter(pool, port=args.metrics_port)
+        print("Metrics at", extras["metrics"].url)
+    if args.trace:
+        from tracing import TraceRecorder
+        extras["trace"] = TraceRecorder(pool)
+    return pool, extras
+
+
+def finish(pool, extras, args, drain=True):
+    if drain:
+        pool.shutdown()
+    else:
+        # Closing the dashboard abandons the backlog; tasks still running
+        # end with the (daemon) worker threads when the process exits
+        dropped = pool.clear_queue()
+        if dropped:
+            print(f"Dropped {dropped} queued tasks.")
+    if "trace" in extras:
+        print("Trace written to", extras["trace"].save(args.trace))
+    if "metrics" in extras:
+        extras["metrics"].stop()
+
+
+def cmd_ui(args):
+    # tkinter / matplotlib are only imported when the GUI is wanted
+    from ui import ThreadUI
+
+    pool, extras = build_pool(args)
     ThreadUI(pool)
+    finish(pool, extras, args, drain=False)
+    return 0
+
+
+def _literal(text):
+    # "10" -> 10, "[1, 2]" -> [1, 2]; anything else stays a string
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def cmd_run(args):
+    from wal import resolve
+
+    fn = resolve(args.task)
+    if fn is None:
+        print(f"error: task {args.task!r} not found", file=sys.stderr)
+        return 2
+    pool, extras = build_pool(args)
+    priority = TaskPriority[args.priority]
+    futures = [pool.submit(priority, fn, _literal(value)) for value in args.values]
+    failed = 0
+    for value, f in zip(args.values, futures):
+        try:
+            print(f"{value}: {f.result()!r}")
+        except Exception as e:
+            failed += 1
+            print(f"{value}: failed: {e!r}")
+    finish(pool, extras, args)
+    return 1 if failed else 0
+
+
+def cmd_loadgen(args):
+    from loadgen import WORKLOADS, LoadGenerator
+
+    if args.workload in WORKLOADS:
+        fn, task_args = WORKLOADS[args.workload](args.work)
+    else:
+        from wal import resolve
+        fn, task_args = resolve(args.workload), tuple(_literal(a) for a in args.arg)
+        if fn is None:
+            print(f"error: task {args.workload!r} not found", file=sys.stderr)
+            return 2
+    if args.priority == "mixed":
+        priorities = list(TaskPriority)
+    else:
+        priorities = [TaskPriority[args.priority]]
+
+    pool, extras = build_pool(args)
+    gen = LoadGenerator(pool, fn, task_args, rate=args.rate, burst=args.burst,
+                        burst_interval=args.burst_interval, priorities=priorities,
+                        report_interval=args.report_interval)
+    try:
+        gen.run(args.duration)
+    except KeyboardInterrupt:
+        pool.clear_queue()
+    finish(pool, extras, args)
+    return 0
+
+
+def cmd_node(args):
+    from distributed import run_node
+
+    host, _, port = args.connect.rpartition(":")
+    print(f"Worker node connecting to {host}:{port}")
+    try:
+        run_node((host, int(port)), args.authkey.encode(), num_threads=args.threads,
+                 batch_size=args.batch_size, lease_seconds=args.lease)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Thread pool manager: GUI, headless runner and load generator")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("ui", help="open the Tk dashboard (default)")
+    _add_pool_args(p)
+    p.set_defaults(func=cmd_ui)
+
+    p = sub.add_parser("run", help="run a task for each value, headless, and print the results")
+    _add_pool_args(p)
+    p.add_argument("task", help="task by name, e.g. tasks.simulated_heavy_task")
+    p.add_argument("values", nargs="+", help="one task is submitted per value")
+    p.add_argument("--priority", choices=[t.name for t in TaskPriority], default="MEDIUM")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("loadgen", help="drive the pool at a target rate or in bursts")
+    _add_pool_args(p)
+    p.add_argument("--workload", default="sleep",
+                   help="noop, sleep, cpu or a task name such as tasks.cpu_bound_task")
+    p.add_argument("--work", type=float, default=0.005,
+                   help="seconds per task for the sleep / cpu workloads (default 0.005)")
+    p.add_argument("--arg", action="append", default=[], help="argument for a named task (repeatable)")
+    p.add_argument("--rate", type=float, default=200.0, help="tasks per second (default 200)")
+    p.add_argument("--burst", type=int, default=None, help="submit this many tasks at once ...")
+    p.add_argument("--burst-interval", type=float, default=1.0, help="... every this many seconds")
+    p.add_argument("--duration", type=float, default=10.0, help="seconds of load (default 10)")
+    p.add_argument("--priority", choices=[t.name for t in TaskPriority] + ["mixed"], default="MEDIUM")
+    p.add_argument("--report-interval", type=float, default=1.0)
+    p.set_defaults(func=cmd_loadgen)
+
+    p = sub.add_parser("node", help="run leased tasks for a distributed.Coordinator until it shuts down")
+    p.add_argument("connect", help="coordinator address, HOST:PORT")
+    p.add_argument("--authkey", default="threadpool")
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--batch-size", type=int, default=8, help="tasks leased per request (default 8)")
+    p.add_argument("--lease", type=float, default=10.0,
+                   help="seconds a leased task may go without a heartbeat before redelivery")
+    p.set_defaults(func=cmd_node)
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv = ["ui"] + list(argv)
+    args = parser.parse_args(argv)
+    print("Logging system initialized")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
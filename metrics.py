@@ -0,0 +1,172 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Histogram bucket bounds in seconds (Prometheus "le"), shared by wait and run times
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class _Writer:
+    """Accumulates Prometheus text exposition lines."""
+
+    def __init__(self, namespace, labels):
+        self.namespace = namespace
+        self.labels = labels
+        self.lines = []
+
+    def _labels(self, extra):
+        labels = dict(self.labels, **extra) if extra else self.labels
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+    def family(self, name, kind, help_text):
+        name = f"{self.namespace}_{name}"
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f"{name}{self._labels(labels)} {float(value)!r}")
+
+    def metric(self, name, kind, help_text, value, **labels):
+        self.sample(self.family(name, kind, help_text), value, **labels)
+
+    def histogram(self, name, by_label, histograms, help_text):
+        """histograms: {label value: LatencyHistogram}"""
+        name = self.family(name, "histogram", help_text)
+        for label, hist in histograms.items():
+            counts, count = hist.cumulative(BUCKETS)
+            for bound, n in zip(BUCKETS, counts):
+                self.sample(f"{name}_bucket", n, **{by_label: label, "le": repr(bound)})
+            self.sample(f"{name}_bucket", count, **{by_label: label, "le": "+Inf"})
+            self.sample(f"{name}_sum", hist.total, **{by_label: label})
+            self.sample(f"{name}_count", count, **{by_label: label})
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def render(pool, namespace="threadpool", labels=None):
+    """Pool counters, gauges and per-priority latency histograms in
+    Prometheus text format.
+
+    Everything is read from pool.snapshot(), the stats histograms and plain
+    counter dicts without taking pool.lock or the queue lock, so a scrape
+    never makes workers wait; values may be a few tasks apart.
+    """
+    snap = pool.snapshot()
+    out = _Writer(namespace, labels or {})
+
+    out.metric("tasks_completed_total", "counter", "Tasks that finished running.",
+               snap["completed_tasks"])
+    name = out.family("tasks_finished_total", "counter", "Tasks resolved after their last attempt, by outcome.")
+    out.sample(name, snap["succeeded_tasks"], outcome="success")
+    out.sample(name, snap["failed_tasks"], outcome="failure")
+    out.metric("task_retries_total", "counter", "Failed attempts scheduled to run again.", snap["retried_tasks"])
+    out.metric("retry_pending", "gauge", "Tasks waiting out a retry backoff.", snap["retry_pending"])
+    out.metric("dead_letters", "gauge", "Failed tasks held in the dead-letter queue.", snap["dead_letters"])
+    out.metric("tasks_active", "gauge", "Tasks running right now.", snap["active_tasks"])
+    out.metric("queue_size", "gauge", "Tasks waiting to run.", snap["queue_size"])
+    out.metric("threads", "gauge", "Live worker threads.", snap["num_threads"])
+    out.metric("workers_busy", "gauge", "Workers currently running a task.",
+               sum(1 for w in snap["workers"] if w["busy"]))
+    out.metric("paused", "gauge", "1 while the pool is paused.", int(snap["paused"]))
+    out.metric("workers_started_total", "counter", "Worker threads started.", pool.workers_started)
+    out.metric("workers_retired_total", "counter", "Idle worker threads retired by autoscaling.",
+               pool.workers_retired)
+
+    name = out.family("overflow_total", "counter", "Submissions hitting a full queue, by outcome.")
+    for kind, n in snap["overflow"].items():
+        out.sample(name, n, outcome=kind)
+
+    name = out.family("deadline_missed_total", "counter", "Tasks dropped because their deadline passed while queued.")
+    for priority, n in dict(pool.deadline_misses).items():
+        out.sample(name, n, priority=priority.name)
+    name = out.family("deadline_late_total", "counter", "Tasks that finished after their deadline.")
+    for priority, n in dict(pool.deadline_late).items():
+        out.sample(name, n, priority=priority.name)
+
+    by_priority = pool.stats.by_priority
+    out.histogram("task_wait_seconds", "priority",
+                  {p.name: s.wait for p, s in by_priority.items()}, "Time tasks spent queued.")
+    out.histogram("task_run_seconds", "priority",
+                  {p.name: s.run for p, s in by_priority.items()}, "Time tasks spent running.")
+
+    cache = snap.get("cache")
+    if cache:
+        name = out.family("cache_lookups_total", "counter", "Result cache lookups, by outcome.")
+        for outcome in ("hits", "misses", "coalesced", "uncacheable"):
+            out.sample(name, cache[outcome], outcome=outcome)
+        out.metric("cache_evictions_total", "counter", "Cached results evicted for room.", cache["evictions"])
+        out.metric("cache_entries", "gauge", "Results held by the cache.", cache["entries"])
+        out.metric("cache_bytes", "gauge", "Approximate size of the cached results.", cache["bytes"])
+
+    tenants = snap.get("tenants") or {}
+    if tenants:
+        families = (
+            ("tenant_dispatched_total", "counter", "Tasks started per tenant.", "dispatched"),
+            ("tenant_running", "gauge", "Tasks running per tenant.", "running"),
+            ("tenant_parked", "gauge", "Tasks held back by their tenant's limits.", "parked"),
+        )
+        for metric, kind, help_text, key in families:
+            name = out.family(metric, kind, help_text)
+            for tenant, counters in tenants.items():
+                out.sample(name, counters[key], tenant=tenant)
+        name = out.family("tenant_throttled_total", "counter", "Times a task was held back, by tenant and limit.")
+        for tenant, counters in tenants.items():
+            out.sample(name, counters["throttled_rate"], tenant=tenant, limit="rate")
+            out.sample(name, counters["throttled_concurrency"], tenant=tenant, limit="concurrency")
+    return out.text()
+
+
+class MetricsExporter:
+    """Serves render(pool) at http://host:port/metrics from a daemon thread.
+
+    port=0 binds a free port (see .port). Call stop() to close the socket.
+    """
+
+    def __init__(self, pool, host="127.0.0.1", port=9100, namespace="threadpool", labels=None):
+        self.pool = pool
+        self.namespace = namespace
+        self.labels = labels
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address[:2]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-exporter",
+                                        daemon=True)
+        self._thread.start()
+
+    def render(self):
+        return render(self.pool, self.namespace, self.labels)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
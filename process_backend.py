@@ -0,0 +1,245 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import pickle
+import queue
+import threading
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+# Buffers at least this large travel through shared memory instead of the pipe
+SHM_THRESHOLD = 64 * 1024
+
+
+class SharedBuffer:
+    """Picklable stand-in for a large bytes/ndarray living in shared memory."""
+
+    __slots__ = ("name", "nbytes", "dtype", "shape", "kind")
+
+    def __init__(self, name, nbytes, dtype=None, shape=None, kind=bytes):
+        self.name = name
+        self.nbytes = nbytes
+        self.dtype = dtype                # None -> plain bytes
+        self.shape = shape
+        self.kind = kind                  # bytes or bytearray, rebuilt on the other side
+
+    def __getstate__(self):
+        return (self.name, self.nbytes, self.dtype, self.shape, self.kind)
+
+    def __setstate__(self, state):
+        self.name, self.nbytes, self.dtype, self.shape, self.kind = state
+
+
+def _export(value, threshold, segments):
+    """Move a large buffer into shared memory; other values pass through."""
+    if np is not None and isinstance(value, np.ndarray) and value.nbytes >= threshold:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, value.nbytes))
+        np.ndarray(value.shape, value.dtype, buffer=shm.buf)[...] = value
+        segments.append(shm)
+        return SharedBuffer(shm.name, value.nbytes, value.dtype.str, value.shape)
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= threshold:
+        kind = bytearray if isinstance(value, bytearray) else bytes
+        with memoryview(value).cast("B") as data:
+            nbytes = data.nbytes
+            shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+            shm.buf[:nbytes] = data
+        segments.append(shm)
+        return SharedBuffer(shm.name, nbytes, kind=kind)
+    return value
+
+
+def _read_bytes(shm, value):
+    # Copy out as the original type; the temporary view is released before close()
+    with shm.buf[:value.nbytes] as view:
+        return value.kind(view)
+
+
+def _attach(value, segments):
+    """Child side: map an ndarray SharedBuffer without copying it. Byte
+    buffers are copied into bytes / bytearray so tasks see the same type
+    as on the thread backend (one memcpy, still no pickling)."""
+    if not isinstance(value, SharedBuffer):
+        return value
+    shm = shared_memory.SharedMemory(name=value.name)
+    if value.dtype is None:
+        try:
+            return _read_bytes(shm, value)
+        finally:
+            shm.close()
+    segments.append(shm)
+    return np.ndarray(value.shape, np.dtype(value.dtype), buffer=shm.buf)
+
+
+def _collect(value):
+    """Parent side: copy a result out of shared memory and free the segment."""
+    if not isinstance(value, SharedBuffer):
+        return value
+    shm = shared_memory.SharedMemory(name=value.name)
+    try:
+        if value.dtype is not None:
+            out = np.ndarray(value.shape, np.dtype(value.dtype), buffer=shm.buf).copy()
+        else:
+            out = _read_bytes(shm, value)
+    finally:
+        shm.close()
+        shm.unlink()
+    return out
+
+
+def _release(segments, unlink):
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            pass                          # a result still references the buffer
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _picklable_error(e):
+    try:
+        pickle.dumps(e)
+        return e
+    except Exception:
+        return RuntimeError(f"{type(e).__name__}: {e}")
+
+
+def _picklable_outcome(outcome):
+    ok, value, seconds = outcome
+    try:
+        pickle.dumps(value)
+        return outcome
+    except Exception as e:
+        return (False, RuntimeError(f"result could not be pickled: {e}"), seconds)
+
+
+def _child_main(conn, threshold):
+    """Worker process: run batches of (fn, args) and send the outcomes back."""
+    while True:
+        try:
+            batch = pickle.loads(conn.recv_bytes())
+        except EOFError:
+            break
+        if batch is None:
+            break
+
+        outcomes = []
+        for fn, args in batch:
+            segments = []
+            start = time.perf_counter()
+            try:
+                value = fn(*[_attach(a, segments) for a in args])
+                result_segments = []
+                value = _export(value, threshold, result_segments)
+                _release(result_segments, unlink=False)
+                outcomes.append((True, value, time.perf_counter() - start))
+            except Exception as e:
+                outcomes.append((False, _picklable_error(e), time.perf_counter() - start))
+            value = None
+            _release(segments, unlink=False)
+
+        try:
+            data = pickle.dumps(outcomes, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            data = pickle.dumps([_picklable_outcome(o) for o in outcomes], pickle.HIGHEST_PROTOCOL)
+        conn.send_bytes(data)
+
+
+class _Child:
+    def __init__(self, ctx, threshold):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_child_main, args=(child_conn, threshold), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+
+class ProcessBackend:
+    """Runs ThreadPool tasks in worker processes.
+
+    Each dispatching worker thread checks out one child process, sends it a
+    whole batch of (fn, args) in a single pickle and waits for the batch of
+    outcomes. Large bytes / NumPy arguments and results go through shared
+    memory and arrive as the same type (a memoryview arrives as bytes).
+    Task functions must be importable (module level) to be pickled.
+    """
+
+    def __init__(self, processes=None, batch_size=16, shm_threshold=SHM_THRESHOLD,
+                 mp_context="spawn"):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.shm_threshold = shm_threshold
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._idle = queue.SimpleQueue()
+        self._children = []
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._children) < self.processes:
+                child = _Child(self._ctx, self.shm_threshold)
+                self._children.append(child)
+                return child
+        return self._idle.get()
+
+    def _replace(self, child):
+        with self._lock:
+            self._children.remove(child)
+            child.process.kill()
+            fresh = _Child(self._ctx, self.shm_threshold)
+            self._children.append(fresh)
+            return fresh
+
+    def run_batch(self, calls):
+        """Run [(fn, args), ...]; returns [(ok, result_or_exception, seconds), ...]."""
+        segments = []
+        try:
+            payload = [(fn, tuple(_export(a, self.shm_threshold, segments) for a in args))
+                       for fn, args in calls]
+            try:
+                data = pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                if len(calls) == 1:
+                    raise
+                # Keep the batch but isolate the items that cannot be pickled
+                return [o for call in calls for o in self.run_batch([call])]
+
+            child = self._checkout()
+            try:
+                child.conn.send_bytes(data)
+                outcomes = pickle.loads(child.conn.recv_bytes())
+            except (EOFError, OSError) as e:
+                child = self._replace(child)
+                err = RuntimeError(f"worker process died: {e!r}")
+                return [(False, err, 0.0) for _ in calls]
+            finally:
+                self._idle.put(child)
+        except Exception as e:
+            return [(False, e, 0.0) for _ in calls]
+        finally:
+            _release(segments, unlink=True)
+
+        return [(ok, _collect(value) if ok else value, seconds) for ok, value, seconds in outcomes]
+
+    def shutdown(self):
+        with self._lock:
+            children, self._children = self._children, []
+        for child in children:
+            try:
+                child.conn.send_bytes(pickle.dumps(None))
+            except OSError:
+                pass
+        for child in children:
+            child.process.join(timeout=5)
+            if child.process.is_alive():
+                child.process.kill()
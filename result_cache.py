@@ -0,0 +1,166 @@
+import collections
+import sys
+import threading
+import time
+
+from futures import Future
+
+
+class _Flight:
+    """An execution in progress; identical submissions wait here for its Future."""
+
+    __slots__ = ("ready", "future")
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.future = None
+
+
+class ResultCache:
+    """Memoizes task results by (fn, args) and coalesces identical in-flight work.
+
+    A hit returns an already-resolved Future. While a task is queued or
+    running, identical submissions get the very same Future (singleflight),
+    so cancelling it cancels it for every caller. Only successful results
+    are stored; exceptions and cancellations are not cached.
+
+    Entries are evicted least-recently-used first once there are more than
+    max_entries or their sizes (sizeof, shallow sys.getsizeof by default)
+    add up to more than max_bytes, and lazily once older than ttl seconds.
+    Tasks whose args are not hashable bypass the cache.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, max_bytes=None, sizeof=sys.getsizeof,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.clock = clock
+        self._entries = collections.OrderedDict()   # key -> (value, expires_at, size)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.uncacheable = 0
+
+    @staticmethod
+    def key(fn, args):
+        # Argument types are part of the key so f(1), f(1.0) and f(True) stay apart
+        key = (fn, args, tuple(type(a) for a in args))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get_or_submit(self, fn, args, launch):
+        """Return a Future for fn(*args): cached, shared with an identical
+        in-flight task, or the one returned by launch()."""
+        key = self.key(fn, args)
+        if key is None:
+            with self._lock:
+                self.uncacheable += 1
+            return launch()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] is not None and self.clock() >= entry[1]:
+                    self._drop(key)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    f = Future()
+                    f.set_result(entry[0])
+                    return f
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+
+        if not owner:
+            flight.ready.wait()
+            if flight.future is not None:
+                return flight.future
+            return self.get_or_submit(fn, args, launch)   # the first launch failed
+
+        try:
+            future = launch()
+        except BaseException:
+            self._finish(key, flight)
+            raise
+        flight.future = future
+        flight.ready.set()
+        if future is None:                # try_submit() on a full queue
+            self._finish(key, flight)
+        else:
+            future.add_done_callback(lambda f: self._complete(key, flight, f))
+        return future
+
+    def _finish(self, key, flight):
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+        flight.ready.set()
+
+    def _complete(self, key, flight, future):
+        if future.cancelled() or future.exception() is not None:
+            self._finish(key, flight)
+            return
+        value = future.result()
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            expires = None if self.ttl is None else self.clock() + self.ttl
+            self._entries[key] = (value, expires, size)
+            self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        # Caller holds self._lock
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def invalidate(self, fn=None, args=None):
+        """Forget one (fn, args) result, or everything when called without arguments."""
+        with self._lock:
+            if fn is None:
+                self._entries.clear()
+                self.bytes = 0
+                return
+            key = self.key(fn, args)
+            if key in self._entries:
+                self._drop(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "uncacheable": self.uncacheable,
+        }
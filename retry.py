@@ -0,0 +1,168 @@
+import collections
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from cancellation import DeadlineExceeded, TaskCancelled
+
+
+class RetryPolicy:
+    """How often and how soon a failed task is run again.
+
+    A task is retried while it has run fewer than max_attempts times and it
+    raised an instance of retry_on that is not an instance of give_up_on.
+    Retry n waits backoff * multiplier ** (n - 1) seconds, capped at
+    max_backoff. With jitter j the wait is drawn uniformly from
+    [(1 - j) * d, d] (j=1 is "full jitter"), so tasks that failed together
+    do not all come back at the same moment.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.1, multiplier=2.0, max_backoff=30.0, jitter=1.0,
+                 retry_on=(Exception,), give_up_on=(TaskCancelled, DeadlineExceeded), rng=None):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1")
+        if not 0.0 <= jitter <= 1.0:
+            raise ValueError("jitter must be between 0 and 1")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_on = tuple(retry_on)
+        self.give_up_on = tuple(give_up_on)
+        self.rng = rng or random.Random()
+
+    def should_retry(self, attempts, exc):
+        """attempts: runs so far, including the one that raised exc."""
+        return (attempts < self.max_attempts and isinstance(exc, self.retry_on)
+                and not isinstance(exc, self.give_up_on))
+
+    def delay(self, attempts):
+        """Seconds to wait before run attempts + 1."""
+        d = min(self.max_backoff, self.backoff * self.multiplier ** (attempts - 1))
+        if self.jitter:
+            d -= self.jitter * d * self.rng.random()
+        return d
+
+    def __repr__(self):
+        return (f"RetryPolicy(max_attempts={self.max_attempts}, backoff={self.backoff}, "
+                f"multiplier={self.multiplier}, max_backoff={self.max_backoff}, jitter={self.jitter})")
+
+
+class DelayQueue:
+    """Calls fn(*args) at given times from one daemon thread (a delay heap).
+
+    The thread starts with the first call_at() and sleeps until the earliest
+    due time, so waiting retries never hold a pool worker.
+    """
+
+    def __init__(self, name="retry-timer"):
+        self.name = name
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def call_at(self, when, fn, *args):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("delay queue is closed")
+            earliest = not self._heap or when < self._heap[0][0]
+            heapq.heappush(self._heap, (when, next(self._seq), fn, args))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            elif earliest:
+                self._cond.notify()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._heap:
+                        return
+                    if self._heap:
+                        delay = self._heap[0][0] - time.time()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                _, _, fn, args = heapq.heappop(self._heap)
+            try:
+                fn(*args)
+            except Exception as e:
+                print("Task error:", e)
+
+    def close(self):
+        """Stop the thread once everything already scheduled has been called."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+
+class DeadLetter:
+    """A task that failed for good, with enough to inspect or resubmit it."""
+
+    __slots__ = ("fn", "args", "priority", "tenant", "retry", "attempts", "error", "failed_at")
+
+    def __init__(self, task, error):
+        self.fn = task.fn
+        self.args = task.args
+        self.priority = task.priority
+        self.tenant = task.tenant
+        self.retry = task.retry
+        self.attempts = task.attempts
+        self.error = error
+        self.failed_at = time.time()
+
+    def __repr__(self):
+        return (f"<DeadLetter {getattr(self.fn, '__name__', self.fn)} {self.priority.name} "
+                f"attempts={self.attempts} error={self.error!r}>")
+
+
+class DeadLetterQueue:
+    """Bounded record of failed tasks, newest last; the oldest entries are
+    dropped (and counted) once maxlen is reached."""
+
+    def __init__(self, maxlen=1000):
+        self._items = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.total = 0
+        self.dropped = 0
+
+    def add(self, task, error):
+        with self._lock:
+            if self._items.maxlen == 0:
+                self.dropped += 1
+                return
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(DeadLetter(task, error))
+            self.total += 1
+
+    def items(self):
+        with self._lock:
+            return list(self._items)
+
+    def pop_all(self):
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self.items())
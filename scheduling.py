@@ -0,0 +1,201 @@
+import itertools
+import time
+
+from task_queue import TaskQueue
+
+
+# Every policy exposes the TaskQueue interface (push / push_many / pop /
+# remove / update / clear / top / len / in / iter) so ThreadPool can swap them.
+
+class StrictPriority(TaskQueue):
+    """Always run the highest TaskPriority first, FIFO within a class."""
+
+
+def deadline_key(task):
+    deadline = task.deadline if task.deadline is not None else float("inf")
+    return (deadline, task.priority.value, task.seq)
+
+
+class EarliestDeadlineFirst(TaskQueue):
+    """Run the task with the nearest deadline first; tasks without one go last,
+    ordered by priority."""
+
+    def __init__(self):
+        super().__init__(key=deadline_key)
+
+
+class _Chained:
+    """Tasks dropped by clear(), spread over several lists."""
+
+    def __init__(self, lists):
+        self._lists = lists
+
+    def __len__(self):
+        return sum(len(lst) for lst in self._lists)
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._lists)
+
+
+class _PerClassQueues:
+    """One FIFO (indexed heap) per TaskPriority; subclasses pick which class runs next."""
+
+    def __init__(self, priorities, clock=time.time):
+        self.priorities = sorted(priorities, key=lambda p: p.value)
+        self.clock = clock
+        self._queues = {p: TaskQueue() for p in self.priorities}
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def __bool__(self):
+        return any(self._queues.values())
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(iter(q) for q in self._queues.values())
+
+    def __contains__(self, task):
+        return task in self._queues[task.priority]
+
+    def _owner(self, task):
+        for q in self._queues.values():
+            if task in q:
+                return q
+        return None
+
+    def peek(self):
+        p = self._choose()
+        return None if p is None else self._queues[p].peek()
+
+    def push(self, task):
+        q = self._queues[task.priority]
+        if not q:
+            self._activate(task.priority)
+        q.push(task)
+
+    def push_many(self, tasks):
+        groups = {}
+        for task in tasks:
+            groups.setdefault(task.priority, []).append(task)
+        for p, group in groups.items():
+            if not self._queues[p]:
+                self._activate(p)
+            self._queues[p].push_many(group)
+
+    def pop(self):
+        p = self._choose()
+        if p is None:
+            raise IndexError("pop from empty queue")
+        self._charge(p)
+        return self._queues[p].pop()
+
+    def remove(self, task):
+        q = self._owner(task)
+        return q is not None and q.remove(task)
+
+    def update(self, task):
+        """Move a task whose priority changed into its new class queue."""
+        q = self._owner(task)
+        if q is None:
+            return False
+        q.remove(task)
+        self.push(task)
+        return True
+
+    def clear(self):
+        return _Chained([q.clear() for q in self._queues.values()])
+
+    def top(self, n):
+        """The first n tasks of every class, in priority order (the policy may
+        interleave classes differently when it runs them)."""
+        out = []
+        for p in self.priorities:
+            if len(out) >= n:
+                break
+            out.extend(self._queues[p].top(n - len(out)))
+        return out
+
+    # ---------------- policy hooks ----------------
+    def _choose(self):
+        raise NotImplementedError
+
+    def _activate(self, priority):
+        pass
+
+    def _charge(self, priority):
+        pass
+
+
+class AgingPriority(_PerClassQueues):
+    """Strict priority, but a waiting task gains one priority level per
+    aging_interval seconds, so LOW work cannot wait forever."""
+
+    def __init__(self, priorities, aging_interval=1.0, clock=time.time):
+        super().__init__(priorities, clock)
+        self.aging_interval = aging_interval
+
+    def _choose(self):
+        now = self.clock()
+        best = None
+        best_key = None
+        for p in self.priorities:
+            head = self._queues[p].peek()
+            if head is None:
+                continue
+            key = (p.value - (now - head.submitted) / self.aging_interval, p.value, head.seq)
+            if best_key is None or key < best_key:
+                best, best_key = p, key
+        return best
+
+
+class WeightedFair(_PerClassQueues):
+    """Weighted fair queuing across classes (stride scheduling).
+
+    Each class gets a share of dispatches proportional to its weight while it
+    has work queued; default weights are HIGH 6, MEDIUM 3, LOW 1.
+    """
+
+    DEFAULT_WEIGHTS = {1: 6, 2: 3, 3: 1}
+
+    def __init__(self, priorities, weights=None, clock=time.time):
+        super().__init__(priorities, clock)
+        weights = weights or {}
+        self.weights = {p: weights.get(p, self.DEFAULT_WEIGHTS.get(p.value, 1)) for p in self.priorities}
+        self._pass = {p: 0.0 for p in self.priorities}
+        self._vtime = 0.0
+
+    def _activate(self, priority):
+        # A class returning from idle starts at the current virtual time
+        # instead of cashing in credit saved while it had nothing queued
+        self._pass[priority] = max(self._pass[priority], self._vtime)
+
+    def _choose(self):
+        best = None
+        for p in self.priorities:
+            if self._queues[p] and (best is None or self._pass[p] < self._pass[best]):
+                best = p
+        return best
+
+    def _charge(self, priority):
+        self._vtime = self._pass[priority]
+        self._pass[priority] += 1.0 / self.weights[priority]
+
+
+SCHEDULERS = {
+    "strict": StrictPriority,
+    "aging": AgingPriority,
+    "wfq": WeightedFair,
+    "edf": EarliestDeadlineFirst,
+}
+
+
+def make_scheduler(name, priorities, **options):
+    """Build a queue for ThreadPool(scheduler=name, scheduler_options=...)."""
+    try:
+        cls = SCHEDULERS[name]
+    except KeyError:
+        raise ValueError(f"unknown scheduler: {name!r} (choose from {sorted(SCHEDULERS)})") from None
+    if issubclass(cls, _PerClassQueues):
+        return cls(priorities, **options)
+    return cls(**options)
+
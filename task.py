@@ -1,8 +1,10 @@
 import threading
 import queue
-import time
+import itertools
 from enum import Enum
 
+from futures import Future
+
 
 class TaskPriority(Enum):
     HIGH = 1
@@ -18,12 +20,14 @@ class ThreadPool:
         self.lock = threading.Lock()
         self.paused = False
         self.stopped = False
+        self.work_ready = threading.Condition()
 
         self.completed_tasks = 0
         self.active_tasks = 0
 
         # Track current running task
         self.current_task = None
+        self._seq = itertools.count()
 
         self.threads = []
         for _ in range(num_threads):
@@ -32,21 +36,28 @@ class ThreadPool:
             self.threads.append(t)
 
     def submit(self, priority, fn, *args):
-        self.tasks.put((priority.value, fn, args))
+        future = Future()
+        self.tasks.put((priority.value, next(self._seq), fn, args, future))
+        with self.work_ready:
+            self.work_ready.notify()
+        return future
 
     def worker(self):
         while True:
 
-            if self.stopped and self.tasks.empty():
-                break
-
-            if self.paused:
-                time.sleep(0.1)
-                continue
+            with self.work_ready:
+                while not self.stopped and (self.paused or self.tasks.empty()):
+                    self.work_ready.wait()
 
             try:
-                priority, fn, args = self.tasks.get(timeout=0.2)
+                priority, _, fn, args, future = self.tasks.get_nowait()
             except queue.Empty:
+                if self.stopped:
+                    break
+                continue
+
+            if not future.set_running_or_notify_cancel():
+                self.tasks.task_done()
                 continue
 
 # Track current running tasks
@@ -56,9 +67,10 @@ class ThreadPool:
                 self.active_tasks += 1
 
             try:
-                fn(*args)
+                future.set_result(fn(*args))
             except Exception as e:
                 print("Task error:", e)
+                future.set_exception(e)
 
             with self.lock:
                 self.active_tasks -= 1
@@ -70,14 +82,19 @@ class ThreadPool:
             self.tasks.task_done()
 
     def pause(self):
-        self.paused = True
+        with self.work_ready:
+            self.paused = True
 
     def resume(self):
-        self.paused = False
+        with self.work_ready:
+            self.paused = False
+            self.work_ready.notify_all()
 
     def shutdown(self):
         print("Graceful shutdown initiated...")
-        self.stopped = True
+        with self.work_ready:
+            self.stopped = True
+            self.work_ready.notify_all()
         self.tasks.join()
         print("All queued tasks completed. Stopping threads now...")
 
@@ -86,4 +103,4 @@ class ThreadPool:
 
     # NEW FUNCTION → Used by UI to show pending queue
     def get_queue_items(self):
-        return list(self.tasks.queue)
+        return [(priority, fn, args) for priority, _, fn, args, _ in list(self.tasks.queue)]
@@ -0,0 +1,176 @@
+import heapq
+
+
+class Task:
+    """One submitted unit of work, as stored in a TaskQueue."""
+
+    __slots__ = ("priority", "seq", "fn", "args", "future", "submitted", "key", "index",
+                 "deadline", "token", "tenant", "log_id", "retry", "attempts")
+
+    def __init__(self, priority, seq, fn, args, future, submitted, deadline=None, tenant=None):
+        self.priority = priority          # TaskPriority
+        self.seq = seq                    # submission order, FIFO tiebreak
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.submitted = submitted
+        self.key = None                   # sort key, set by the queue
+        self.index = -1                   # position in the heap, -1 when not queued
+        self.deadline = deadline          # absolute time.time(); skipped once passed
+        self.token = None                 # CancelToken, created when the task starts
+        self.tenant = tenant              # rate-limit / concurrency-cap key, see tenants.py
+        self.log_id = None                # write-ahead log record id when durable
+        self.retry = None                 # RetryPolicy, False for none, None for the pool's
+        self.attempts = 0                 # runs finished so far
+
+    def __repr__(self):
+        return f"<Task {self.priority.name} #{self.seq} {getattr(self.fn, '__name__', self.fn)}>"
+
+
+def priority_key(task):
+    return (task.priority.value, task.seq)
+
+
+class TaskQueue:
+    """Indexed binary min-heap of Tasks.
+
+    Every task remembers its own heap position, so removing a task or
+    changing its priority is O(log n) and never compares functions, args
+    or futures. clear() swaps out the backing list in O(1).
+
+    Not thread-safe: ThreadPool only touches it while holding its queue lock.
+    """
+
+    def __init__(self, key=priority_key):
+        self._key = key
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+    def __iter__(self):
+        """Queued tasks in heap (not sorted) order."""
+        return iter(list(self._heap))
+
+    def __contains__(self, task):
+        i = task.index
+        return 0 <= i < len(self._heap) and self._heap[i] is task
+
+    def peek(self):
+        return self._heap[0] if self._heap else None
+
+    def push(self, task):
+        task.key = self._key(task)
+        task.index = len(self._heap)
+        self._heap.append(task)
+        self._sift_up(task.index)
+
+    def push_many(self, tasks):
+        """Add a batch: one heapify when the batch is large, else one push each."""
+        heap = self._heap
+        if len(tasks) < max(16, len(heap) // 4):
+            for task in tasks:
+                self.push(task)
+            return
+        key = self._key
+        for task in tasks:
+            task.key = key(task)
+        heap.extend(tasks)
+        for i, task in enumerate(heap):
+            task.index = i
+        for i in reversed(range(len(heap) // 2)):
+            self._sift_down(i)
+
+    def pop(self):
+        """Remove and return the smallest task. Raises IndexError when empty."""
+        heap = self._heap
+        top = heap[0]
+        last = heap.pop()
+        if heap:
+            heap[0] = last
+            last.index = 0
+            self._sift_down(0)
+        top.index = -1
+        return top
+
+    def remove(self, task):
+        """Take a queued task out of the heap. Returns False if it is not queued."""
+        if task not in self:
+            return False
+        heap = self._heap
+        i = task.index
+        last = heap.pop()
+        if last is not task:
+            heap[i] = last
+            last.index = i
+            self._sift_down(i)
+            self._sift_up(last.index)
+        task.index = -1
+        return True
+
+    def update(self, task):
+        """Re-key a queued task after its priority (or deadline) changed."""
+        if task not in self:
+            return False
+        task.key = self._key(task)
+        self._sift_up(task.index)
+        self._sift_down(task.index)
+        return True
+
+    def top(self, n):
+        """The n smallest tasks in order, in O(n log n) however long the queue is."""
+        heap = self._heap
+        out = []
+        frontier = [(heap[0].key, 0)] if heap else []
+        while frontier and len(out) < n:
+            _, i = heapq.heappop(frontier)
+            out.append(heap[i])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child].key, child))
+        return out
+
+    def clear(self):
+        """Empty the queue in O(1). Returns the old backing list."""
+        old, self._heap = self._heap, []
+        return old
+
+    # ---------------- heap internals ----------------
+    def _sift_up(self, i):
+        heap = self._heap
+        task = heap[i]
+        key = task.key
+        while i > 0:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if key >= p.key:
+                break
+            heap[i] = p
+            p.index = i
+            i = parent
+        heap[i] = task
+        task.index = i
+
+    def _sift_down(self, i):
+        heap = self._heap
+        n = len(heap)
+        task = heap[i]
+        key = task.key
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            right = child + 1
+            if right < n and heap[right].key < heap[child].key:
+                child = right
+            c = heap[child]
+            if key <= c.key:
+                break
+            heap[i] = c
+            c.index = i
+            i = child
+        heap[i] = task
+        task.index = i
@@ -0,0 +1,185 @@
+import math
+
+
+class TaskRecord:
+    """Compact history entry for one finished task."""
+
+    __slots__ = ("value", "priority", "wait", "duration", "finished_at", "ok")
+
+    def __init__(self, value, priority, wait, duration, finished_at, ok=True):
+        self.value = value
+        self.priority = priority          # TaskPriority value (int)
+        self.wait = wait                  # seconds spent queued
+        self.duration = duration          # seconds spent running
+        self.finished_at = finished_at
+        self.ok = ok
+
+    def __repr__(self):
+        return f"<TaskRecord {self.value!r} p={self.priority} {self.duration:.3f}s>"
+
+
+class RingBuffer:
+    """Fixed-capacity buffer that keeps only the newest items."""
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._items = [None] * capacity
+        self._written = 0                 # total appends ever
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def append(self, item):
+        self._items[self._written % self.capacity] = item
+        self._written += 1
+
+    @property
+    def total(self):
+        """Number of items ever appended, including overwritten ones."""
+        return self._written
+
+    def recent(self, n=None):
+        """Newest n items (all kept items by default), oldest first."""
+        written, cap = self._written, self.capacity
+        n = len(self) if n is None else max(0, min(n, len(self)))
+        start = written - n
+        return [self._items[i % cap] for i in range(start, written)]
+
+    def since(self, version):
+        """Items appended after total was version, oldest first, and how many
+        of those were already overwritten: (items, missed)."""
+        written = self._written
+        missed = max(0, written - self.capacity - version)
+        start = max(version, written - len(self))
+        cap = self.capacity
+        return [self._items[i % cap] for i in range(start, written)], missed
+
+    def __iter__(self):
+        return iter(self.recent())
+
+    def __getitem__(self, index):
+        return self.recent()[index]
+
+    def clear(self):
+        self._items = [None] * self.capacity
+        self._written = 0
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram: constant memory, ~2.5% relative quantile error.
+
+    Values (seconds) are clamped to [min_value, max_value]; bucket i covers
+    [min_value * growth**i, min_value * growth**(i+1)).
+    """
+
+    def __init__(self, min_value=1e-6, max_value=3600.0, growth=1.05):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.counts = [0] * (self._bucket(max_value) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, value):
+        if value <= self.min_value:
+            return 0
+        return int(math.log(value / self.min_value) / self._log_growth)
+
+    def record(self, value):
+        i = min(self._bucket(value), len(self.counts) - 1)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def cumulative(self, bounds):
+        """Counts of values <= each bound (at bucket resolution), for
+        exporting with coarser fixed buckets such as Prometheus 'le'."""
+        counts = list(self.counts)        # one copy, so concurrent record()s cannot skew it
+        out = []
+        seen = 0
+        i = 0
+        for bound in bounds:
+            # bucket i is fully <= bound once its upper edge is
+            while i < len(counts) and self.min_value * self.growth ** (i + 1) <= bound * (1 + 1e-9):
+                seen += counts[i]
+                i += 1
+            out.append(seen)
+        return out, sum(counts)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen > rank:
+                # geometric middle of the bucket, never above the observed max
+                return min(self.max, self.min_value * self.growth ** (i + 0.5))
+        return self.max
+
+
+class PriorityStats:
+    """Queue-wait and run-time histograms for one TaskPriority."""
+
+    __slots__ = ("wait", "run")
+
+    def __init__(self):
+        self.wait = LatencyHistogram()
+        self.run = LatencyHistogram()
+
+    @property
+    def count(self):
+        return self.run.count
+
+    def record(self, wait, run):
+        self.wait.record(wait)
+        self.run.record(run)
+
+    def merge(self, other):
+        self.wait.merge(other.wait)
+        self.run.merge(other.run)
+
+    def summary(self):
+        out = {"count": self.count}
+        for name, hist in (("wait", self.wait), ("run", self.run)):
+            out[f"{name}_mean"] = hist.mean
+            out[f"{name}_p50"] = hist.quantile(0.50)
+            out[f"{name}_p95"] = hist.quantile(0.95)
+            out[f"{name}_p99"] = hist.quantile(0.99)
+        return out
+
+
+class TaskStats:
+    """Streaming per-priority aggregates; memory does not grow with task count."""
+
+    def __init__(self, priorities):
+        self.by_priority = {p: PriorityStats() for p in priorities}
+
+    def record(self, priority, wait, run):
+        self.by_priority[priority].record(wait, run)
+
+    def merge(self, other):
+        for p, stats in other.by_priority.items():
+            self.by_priority[p].merge(stats)
+
+    def summary(self):
+        """{priority name: {count, wait_mean, wait_p50, ..., run_p99}}"""
+        return {p.name: stats.summary() for p, stats in self.by_priority.items()}
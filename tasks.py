@@ -1,6 +1,19 @@
 import time
 
+from worker_slots import current_handle
+
 def simulated_heavy_task(value):
     print("USER INPUT:", value)
-    time.sleep(3)  # simulate work
-    
\ No newline at end of file
+    handle = current_handle()
+    for step in range(30):
+        time.sleep(0.1)  # simulate work
+        if handle is not None:
+            handle.report((step + 1) * 100 / 30)
+    
+
+def cpu_bound_task(n):
+    """Pure-Python CPU work, used to exercise the process backend."""
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
@@ -0,0 +1,186 @@
+import time
+
+from task_queue import TaskQueue
+
+
+RATE = "rate"
+CONCURRENCY = "concurrency"
+
+
+class TenantState:
+    """Limits, counters and throttled tasks of one tenant.
+
+    rate is a token bucket (tasks per second, bursts of up to burst tasks);
+    max_concurrent caps how many of the tenant's tasks run at once. Either
+    may be None (unlimited).
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "stamp", "max_concurrent", "running",
+                 "parked", "dispatched", "throttled_rate", "throttled_concurrency")
+
+    def __init__(self):
+        self.rate = None
+        self.burst = None
+        self.tokens = 0.0
+        self.stamp = 0.0
+        self.max_concurrent = None
+        self.running = 0
+        self.parked = TaskQueue()         # tasks that reached the head while over limit
+        self.dispatched = 0
+        self.throttled_rate = 0
+        self.throttled_concurrency = 0
+
+    def set_limit(self, rate, burst, max_concurrent, now):
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be > 0 (or None for no rate limit)")
+        if max_concurrent is not None and max_concurrent < 1:
+            raise ValueError("max_concurrent must be >= 1 (or None for no cap)")
+        self.rate = rate
+        self.burst = None if rate is None else float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst or 0.0   # the bucket starts full
+        self.stamp = now
+        self.max_concurrent = max_concurrent
+
+    def blocked(self, now):
+        """CONCURRENCY or RATE when a task may not start now, else None."""
+        if self.max_concurrent is not None and self.running >= self.max_concurrent:
+            return CONCURRENCY
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens < 1.0:
+                return RATE
+        return None
+
+    def ready_at(self, now):
+        """Earliest time a task may start, or None while waiting for a running task."""
+        if self.max_concurrent is not None and self.running >= self.max_concurrent:
+            return None
+        if self.rate is None or self.tokens >= 1.0:
+            return now
+        return self.stamp + (1.0 - self.tokens) / self.rate
+
+    def snapshot(self):
+        return {
+            "parked": len(self.parked),
+            "running": self.running,
+            "dispatched": self.dispatched,
+            "throttled_rate": self.throttled_rate,
+            "throttled_concurrency": self.throttled_concurrency,
+            "rate": self.rate,
+            "burst": self.burst,
+            "max_concurrent": self.max_concurrent,
+        }
+
+
+class TenantLimiter:
+    """Per-tenant rate limits and concurrency caps applied at dispatch time.
+
+    A task whose tenant is over its limit when it reaches the head of the
+    pool's queue is parked here instead of blocking the tasks behind it, and
+    is handed back (ahead of the main queue) once the tenant has room again.
+    Tasks without a tenant are never limited.
+
+    Not thread-safe: ThreadPool only touches it while holding its queue lock.
+    """
+
+    def __init__(self, limits=None, clock=time.time):
+        self.clock = clock
+        self.tenants = {}
+        self.parked = 0                   # tasks parked across all tenants
+        self._throttled = set()           # states with parked tasks
+        for tenant, limit in (limits or {}).items():
+            self.set_limit(tenant, **limit)
+
+    def set_limit(self, tenant, rate=None, burst=None, max_concurrent=None):
+        self._state(tenant).set_limit(rate, burst, max_concurrent, self.clock())
+
+    def _state(self, tenant):
+        state = self.tenants.get(tenant)
+        if state is None:
+            state = self.tenants[tenant] = TenantState()
+        return state
+
+    def __iter__(self):
+        for state in list(self._throttled):
+            yield from state.parked
+
+    def __contains__(self, task):
+        state = self.tenants.get(task.tenant)
+        return state is not None and task in state.parked
+
+    def admit(self, task, now):
+        """Charge the tenant for starting task, or park it and return False."""
+        if task.tenant is None:
+            return True
+        state = self._state(task.tenant)
+        reason = state.blocked(now)
+        if reason is None:
+            if state.rate is not None:
+                state.tokens -= 1.0
+            state.running += 1
+            state.dispatched += 1
+            return True
+        if reason is RATE:
+            state.throttled_rate += 1
+        else:
+            state.throttled_concurrency += 1
+        state.parked.push(task)
+        self.parked += 1
+        self._throttled.add(state)
+        return False
+
+    def finished(self, task):
+        """A dispatched task ended. True if that may unblock a parked task."""
+        if task.tenant is None:
+            return False
+        state = self.tenants[task.tenant]
+        state.running -= 1
+        return state in self._throttled
+
+    def pop_ready(self, now):
+        """Take a parked task whose tenant has room again, or return None."""
+        for state in self._throttled:
+            if state.blocked(now) is None:
+                task = state.parked.pop()
+                self._unpark(state)
+                return task
+        return None
+
+    def ready(self, now):
+        return any(state.blocked(now) is None for state in self._throttled)
+
+    def next_ready_at(self, now):
+        """When the next rate-limited tenant gets a token; None if only
+        concurrency caps are holding tasks back (or nothing is parked)."""
+        times = [t for t in (state.ready_at(now) for state in self._throttled) if t is not None]
+        return min(times) if times else None
+
+    def remove(self, task):
+        state = self.tenants.get(task.tenant)
+        if state is None or not state.parked.remove(task):
+            return False
+        self._unpark(state)
+        return True
+
+    def update(self, task):
+        state = self.tenants.get(task.tenant)
+        return state is not None and state.parked.update(task)
+
+    def clear(self):
+        """Drop every parked task. Returns them."""
+        dropped = []
+        for state in self._throttled:
+            dropped.extend(state.parked.clear())
+        self._throttled.clear()
+        self.parked = 0
+        return dropped
+
+    def _unpark(self, state):
+        self.parked -= 1
+        if not state.parked:
+            self._throttled.discard(state)
+
+    def snapshot(self):
+        """{tenant: counters}; safe to call without the queue lock."""
+        return {tenant: state.snapshot() for tenant, state in list(self.tenants.items())}
@@ -0,0 +1,16 @@
+import time
+
+from dag import TaskGraph
+from thread_pool import ThreadPool, TaskPriority
+
+
+def test_independent_nodes_let_an_autoscaling_pool_grow():
+    pool = ThreadPool(min_threads=1, max_threads=8)
+    graph = TaskGraph(pool)
+    for i in range(8):
+        graph.add(TaskPriority.MEDIUM, time.sleep, 0.1 + i * 1e-6)
+    start = time.time()
+    graph.results(timeout=5)
+    elapsed = time.time() - start
+    pool.shutdown()
+    assert elapsed < 0.6, f"8 x 0.1s nodes took {elapsed:.2f}s; the pool never grew"
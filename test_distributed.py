@@ -0,0 +1,52 @@
+import pickle
+import socket
+import time
+
+import pytest
+
+from distributed import Coordinator, LocalCluster
+from thread_pool import TaskPriority
+
+
+def _accepts(address):
+    try:
+        socket.create_connection(address, timeout=1.0).close()
+    except OSError:
+        return False
+    return True
+
+
+def test_shutdown_closes_listener():
+    coordinator = Coordinator()
+    assert _accepts(coordinator.address)
+    coordinator.shutdown()
+    assert not _accepts(coordinator.address)
+    with pytest.raises(RuntimeError):
+        coordinator.submit(TaskPriority.HIGH, pow, 2, 2)
+
+
+def test_local_cluster_runs_tasks_and_nodes_exit():
+    with LocalCluster(nodes=2, threads_per_node=2) as cluster:
+        futures = [cluster.submit(TaskPriority.MEDIUM, pow, i, 2) for i in range(50)]
+        assert [f.result(30) for f in futures] == [i * i for i in range(50)]
+        address = cluster.coordinator.address
+    assert [p.exitcode for p in cluster.processes] == [0, 0]
+    assert not _accepts(address)
+
+
+def test_cancel_refuses_a_redelivered_task():
+    coordinator = Coordinator()
+    future = coordinator.submit(TaskPriority.HIGH, pow, 2, 10)
+    node = coordinator._register("test", 0, "localhost")
+    assert len(coordinator._lease(node, 1, 0.05, 0.0)) == 1
+    time.sleep(0.1)
+    assert coordinator._lease(node, 0, 1.0, 0.0) == []   # reaps the expired lease
+    assert coordinator.queue_size() == 1 and future.running()
+
+    assert not coordinator.cancel(future)
+    assert coordinator.queue_size() == 1
+    assert not coordinator.join(timeout=0.05)
+    batch = coordinator._lease(node, 1, 5.0, 0.0)
+    coordinator._complete(node, [(batch[0][0], True, pickle.dumps(1024))])
+    assert future.result(1) == 1024 and coordinator.snapshot()["duplicates"] == 0
+    coordinator.shutdown()
@@ -0,0 +1,36 @@
+import operator
+
+import pytest
+
+from process_backend import SHM_THRESHOLD
+from thread_pool import ThreadPool, TaskPriority
+
+
+@pytest.mark.parametrize("data", [b"ab" * SHM_THRESHOLD, bytearray(b"ab" * SHM_THRESHOLD)],
+                         ids=["bytes", "bytearray"])
+def test_large_bytes_behave_like_thread_backend(data, capfd):
+    results = {}
+    for backend in ("thread", "process"):
+        pool = ThreadPool(num_threads=1, backend=backend)
+        futures = [pool.submit(TaskPriority.MEDIUM, bytes.upper, bytes(data)),
+                   pool.submit(TaskPriority.MEDIUM, type, data),
+                   pool.submit(TaskPriority.MEDIUM, operator.getitem, data, slice(0, 4))]
+        results[backend] = [f.result(60) for f in futures]
+        pool.shutdown()
+    assert results["process"] == results["thread"]
+    assert results["process"][0] == b"AB" * SHM_THRESHOLD
+    assert "BufferError" not in capfd.readouterr().err
+
+
+def test_burst_spreads_across_processes():
+    import os
+    import time
+
+    pool = ThreadPool(num_threads=4, backend="process")
+    # start every child first so the burst is not served by whichever spawned first
+    for f in pool.submit_many(TaskPriority.HIGH, time.sleep, [(0.2,)] * 4):
+        f.result(60)
+    futures = pool.submit_many(TaskPriority.MEDIUM, os.getpid, [()] * 16)
+    pids = [f.result(60) for f in futures]
+    pool.shutdown()
+    assert len(set(pids)) > 1
@@ -0,0 +1,40 @@
+import time
+
+from thread_pool import ThreadPool, TaskPriority
+
+
+def test_deadline_is_not_shared_with_a_plain_submission():
+    pool = ThreadPool(num_threads=1, result_cache=True)
+    pool.submit(TaskPriority.HIGH, time.sleep, 0.2)
+    with_deadline = pool.submit(TaskPriority.LOW, pow, 2, 8, timeout=0.05)
+    plain = pool.submit(TaskPriority.HIGH, pow, 2, 8)
+    assert plain is not with_deadline
+    assert plain.result(5) == 256
+    assert isinstance(with_deadline.exception(5), TimeoutError)
+    pool.shutdown()
+
+
+def test_urgent_caller_raises_priority_of_shared_task():
+    pool = ThreadPool(num_threads=1, result_cache=True)
+    pool.submit(TaskPriority.HIGH, time.sleep, 0.1)
+    low = pool.submit(TaskPriority.LOW, pow, 3, 3)
+    queued = pool.submit(TaskPriority.MEDIUM, pow, 5, 5)
+    high = pool.submit(TaskPriority.HIGH, pow, 3, 3)
+    assert high is low
+    order = []
+    low.add_done_callback(lambda f: order.append("shared"))
+    queued.add_done_callback(lambda f: order.append("medium"))
+    assert high.result(5) == 27 and queued.result(5) == 3125
+    assert order == ["shared", "medium"]
+    pool.shutdown()
+
+
+def test_tenant_and_retry_bypass_the_cache():
+    pool = ThreadPool(num_threads=1, result_cache=True)
+    pool.pause()
+    plain = pool.submit(TaskPriority.MEDIUM, pow, 2, 4)
+    assert pool.submit(TaskPriority.MEDIUM, pow, 2, 4, tenant="a") is not plain
+    assert pool.submit(TaskPriority.MEDIUM, pow, 2, 4, retry=False) is not plain
+    assert pool.submit(TaskPriority.MEDIUM, pow, 2, 4) is plain
+    pool.resume()
+    pool.shutdown()
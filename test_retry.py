@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from async_pool import AsyncWorkerPool
+from retry import RetryPolicy
+from thread_pool import ThreadPool, TaskPriority
+
+
+class Flaky:
+    def __init__(self, fails):
+        self.fails = fails
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.fails:
+            raise ConnectionError(f"attempt {self.calls}")
+        return self.calls
+
+
+def _shutdown_within(pool, seconds):
+    t = threading.Thread(target=pool.shutdown, daemon=True)
+    t.start()
+    t.join(seconds)
+    return not t.is_alive()
+
+
+@pytest.mark.parametrize("pool_cls", [ThreadPool, AsyncWorkerPool])
+def test_shutdown_with_pending_retry(pool_cls):
+    pool = pool_cls(num_threads=2, retry=RetryPolicy(max_attempts=3, backoff=0.2, jitter=0))
+    fn = Flaky(fails=1)
+    f = pool.submit(TaskPriority.HIGH, fn)
+    threading.Event().wait(0.05)          # first attempt failed, retry is waiting out its backoff
+    assert pool.snapshot()["retry_pending"] == 1
+
+    assert _shutdown_within(pool, 5), "shutdown() hung on a pending retry"
+    assert f.result(0) == 2
+    assert pool.retried_tasks == 1 and pool.succeeded_tasks == 1
+
+
+def test_shutdown_with_retry_that_fails_for_good():
+    pool = ThreadPool(num_threads=2, retry=RetryPolicy(max_attempts=2, backoff=0.1, jitter=0))
+    f = pool.submit(TaskPriority.HIGH, Flaky(fails=5))
+    threading.Event().wait(0.05)
+    assert _shutdown_within(pool, 5)
+    with pytest.raises(ConnectionError):
+        f.result(0)
+    assert len(pool.dead_letters) == 1
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from thread_pool import ThreadPool
+from wal import resolve
+
+
+def test_resolve_missing_names():
+    assert resolve("nosuchmod.fn") is None
+    assert resolve("nosuchpkg.nosuchmod.fn") is None
+    assert resolve("plain") is None
+    assert resolve("tasks.no_such_task") is None
+    assert resolve("thread_pool.ThreadPool.submit") is ThreadPool.submit
+
+
+def test_replay_skips_tasks_whose_module_is_gone(tmp_path):
+    (tmp_path / "gone_mod.py").write_text("import time\ndef slow(x):\n    time.sleep(10)\n")
+    crash = textwrap.dedent(f"""
+        import os, sys
+        sys.path[:0] = [{str(tmp_path)!r}, {os.path.dirname(os.path.abspath(__file__))!r}]
+        from thread_pool import ThreadPool, TaskPriority
+        import gone_mod
+        p = ThreadPool(num_threads=1, durable={str(tmp_path / "log.wal")!r})
+        for i in range(3):
+            p.submit(TaskPriority.LOW, gone_mod.slow, i)
+        os._exit(0)
+    """)
+    subprocess.run([sys.executable, "-c", crash], check=True, cwd=tmp_path)
+    (tmp_path / "gone_mod.py").unlink()
+
+    pool = ThreadPool(num_threads=1, durable=str(tmp_path / "log.wal"))
+    assert pool.recovered == []
+    pool.shutdown()
@@ -1,8 +1,20 @@
 import threading
 import queue
+import itertools
+import collections
+import heapq
 import time
 from enum import Enum
 
+from futures import Future
+from task_queue import Task
+from task_stats import RingBuffer, TaskRecord, TaskStats
+from worker_slots import WorkerSlot
+from cancellation import CancelToken, DeadlineExceeded, TaskCancelled
+from scheduling import make_scheduler
+from tenants import TenantLimiter
+from retry import DeadLetterQueue, DelayQueue, RetryPolicy
+
 
 class TaskPriority(Enum):
     HIGH = 1
@@ -10,95 +22,867 @@ class TaskPriority(Enum):
     LOW = 3
 
 
+# Overflow policies for a bounded queue (max_queue_size)
+BLOCK = "block"                       # wait up to submit_timeout for room
+REJECT = "reject"                     # raise QueueFullError
+CALLER_RUNS = "caller_runs"           # run the task in the submitting thread
+DROP_OLDEST_LOW = "drop_oldest_low"   # cancel the oldest pending LOW task
+
+
+class QueueFullError(Exception):
+    pass
+
+
+# Instrumentation points for ThreadPool.add_hook()
+HOOK_EVENTS = ("submit", "dequeue", "start", "finish", "error")
+
+
 class ThreadPool:
-    def __init__(self, num_threads=6):
-        self.tasks = queue.PriorityQueue()
-        self.num_threads = num_threads
+    def __init__(self, num_threads=6, min_threads=None, max_threads=None,
+                 scale_up_queue=1, scale_up_wait=0.05, keep_alive=10.0,
+                 backend="thread", batch_size=16,
+                 max_queue_size=None, overflow=BLOCK, submit_timeout=None,
+                 history_size=1000, scheduler="strict", scheduler_options=None,
+                 tenant_limits=None, durable=None, result_cache=None,
+                 retry=None, dead_letter_size=1000):
+        # Scheduling policy: "strict" (priority order), "aging", "wfq"
+        # (weighted fair queuing) or "edf" (earliest deadline first), or any
+        # object with the TaskQueue interface.
+        if isinstance(scheduler, str):
+            scheduler = make_scheduler(scheduler, TaskPriority, **(scheduler_options or {}))
+        self.tasks = scheduler
+
+        # Per-tenant limits: {tenant: {"rate": ..., "burst": ..., "max_concurrent": ...}}.
+        # Tasks submitted with tenant=... that are over their tenant's limit
+        # wait in self.tenants without holding up other tenants' tasks.
+        self.tenants = TenantLimiter(tenant_limits)
+
+        # Backpressure: with max_queue_size set, submit() applies the overflow
+        # policy once that many tasks are pending.
+        if overflow not in (BLOCK, REJECT, CALLER_RUNS, DROP_OLDEST_LOW):
+            raise ValueError(f"unknown overflow policy: {overflow!r}")
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.submit_timeout = submit_timeout
+        self.overflow_stats = {"blocked": 0, "timed_out": 0, "rejected": 0,
+                               "caller_runs": 0, "dropped": 0}
+        self._low_fifo = collections.deque()   # LOW tasks in submit order, pruned lazily
+
+        # Tasks whose deadline passed while queued (skipped) or while running (late)
+        self.deadline_misses = {p: 0 for p in TaskPriority}
+        self.deadline_late = {p: 0 for p in TaskPriority}
+
+        # Autoscaling: enabled when max_threads is given. The pool starts with
+        # min_threads workers, grows while the backlog or queue wait exceeds
+        # the thresholds and retires workers idle for keep_alive seconds.
+        self.autoscale = max_threads is not None
+        if self.autoscale:
+            self.min_threads = max(1, min_threads if min_threads is not None else 1)
+            self.max_threads = max(self.min_threads, max_threads)
+            num_threads = self.min_threads
+        else:
+            self.min_threads = self.max_threads = num_threads
+        self.scale_up_queue = scale_up_queue
+        self.scale_up_wait = scale_up_wait
+        self.keep_alive = keep_alive
+
+        # Execution backend: "thread" runs tasks inline on the worker threads,
+        # "process" (or a ProcessBackend) hands batches to worker processes,
+        # one process per worker thread, so CPU-bound tasks escape the GIL.
+        if backend == "thread":
+            self.backend = None
+        elif backend == "process":
+            from process_backend import ProcessBackend
+            self.backend = ProcessBackend(processes=self.max_threads, batch_size=batch_size)
+        else:
+            self.backend = backend
+        self.batch_size = 1 if self.backend is None else self.backend.batch_size
+
+        self.num_threads = 0              # live workers
+        self.workers_started = 0
+        self.workers_retired = 0
+        self._idle_workers = 0
 
         self.lock = threading.Lock()
         self.paused = False
         self.stopped = False
 
+        # self.tasks is only touched under queue_lock. Idle / paused workers
+        # block on work_ready until a task arrives, the pool resumes or the
+        # pool shuts down (no timeout polling); shutdown() waits on all_done.
+        self.queue_lock = threading.Lock()
+        self.work_ready = threading.Condition(self.queue_lock)
+        self.all_done = threading.Condition(self.queue_lock)
+        self.not_full = threading.Condition(self.queue_lock)
+        self._unfinished = 0              # queued + running + waiting-to-retry tasks
+
         self.completed_tasks = 0
         self.active_tasks = 0
 
-        self.current_task = None          # (priority, fn, args)
-        self.progress = 0                 # % based progress 
-        self.task_history = []            # Stores completed  task
+        # One live-state slot per worker thread; see snapshot()
+        self.workers = {}
+        self._worker_ids = itertools.count(1)
+        self.task_history = RingBuffer(history_size)   # newest completed tasks
+        self.stats = TaskStats(TaskPriority)             # wait / run percentiles per priority
+        self._seq = itertools.count()     # FIFO tiebreak, keeps futures out of comparisons
+
+        # Instrumentation hooks (add_hook). Empty tuples keep the cost to one
+        # truth test per event while nothing is registered.
+        self._on_submit = self._on_dequeue = self._on_start = ()
+        self._on_finish = self._on_error = ()
+
+        # Durability: durable is a WAL file path (or a wal.WriteAheadLog).
+        # submit() returns once the task is logged; tasks still pending when
+        # the process died are replayed at start-up (futures in self.recovered).
+        if isinstance(durable, str):
+            from wal import WriteAheadLog
+            durable = WriteAheadLog(durable)
+        self.wal = durable
+        self.recovered = []
+
+        # Opt-in memoization: True, a dict of ResultCache options or a
+        # ResultCache. Identical (fn, args) submissions then share one run;
+        # submissions with a deadline, tenant or retry policy bypass it.
+        if result_cache is True or isinstance(result_cache, dict):
+            from result_cache import ResultCache
+            result_cache = ResultCache(**(result_cache if isinstance(result_cache, dict) else {}))
+        elif result_cache is False:
+            result_cache = None
+        self.result_cache = result_cache
+
+        # Retries: retry is the default RetryPolicy (or a dict of its options)
+        # for tasks submitted without their own. A failed task waiting out its
+        # backoff sits in the delay queue, not on a worker; tasks that fail
+        # for good are kept in the bounded dead_letters queue.
+        if isinstance(retry, dict):
+            retry = RetryPolicy(**retry)
+        self.retry = retry or None
+        self._retry_timer = DelayQueue()
+        self._retrying = 0                # tasks in _retry_timer, under queue_lock
+        self.dead_letters = DeadLetterQueue(dead_letter_size)
+        self.succeeded_tasks = 0
+        self.failed_tasks = 0
+        self.retried_tasks = 0
 
         self.threads = []
-        for _ in range(num_threads):
-            t = threading.Thread(target=self.worker, daemon=True)
-            t.start()
-            self.threads.append(t)
+        with self.lock:
+            for _ in range(num_threads):
+                self._spawn_worker()
+        if self.wal is not None:
+            self._replay()
+
+    def _spawn_worker(self):
+        # Caller holds self.lock
+        t = threading.Thread(target=self.worker, daemon=True)
+        self.threads.append(t)
+        self.num_threads += 1
+        self.workers_started += 1
+        t.start()
+
+    def _maybe_scale_up(self, wait_time=0.0):
+        if self._idle_workers or self.stopped:
+            return
+        if len(self.tasks) <= self.scale_up_queue and wait_time <= self.scale_up_wait:
+            return
+        with self.lock:
+            if self.num_threads < self.max_threads:
+                self._spawn_worker()
+
+    def _retire_idle_worker(self):
+        # Caller holds self.work_ready; only retire while there is nothing to do
+        if self.tasks and not self.paused:
+            return False
+        with self.lock:
+            if self.num_threads <= self.min_threads:
+                return False
+            self.threads.remove(threading.current_thread())
+            self.num_threads -= 1
+            self.workers_retired += 1
+            return True
+
+    def submit(self, priority, fn, *args, deadline=None, timeout=None, tenant=None, retry=None):
+        """Queue fn(*args). deadline (absolute time.time()) or timeout (seconds
+        from now) drops the task unrun if it is still queued when time is up,
+        and makes its CancelToken report cancelled if it is already running.
+        tenant subjects the task to that tenant's limits (set_tenant_limit).
+        retry is a RetryPolicy for this task (False: never retry; default:
+        the pool's)."""
+        if self.result_cache is not None:
+            return self._submit_cached(priority, fn, args, self.overflow, _deadline(deadline, timeout),
+                                       tenant, retry)
+        return self._submit(priority, fn, args, self.overflow, _deadline(deadline, timeout), tenant, retry)
+
+    def try_submit(self, priority, fn, *args, deadline=None, timeout=None, tenant=None, retry=None):
+        """Like submit() but never blocks: returns None when the queue is full."""
+        if self.result_cache is not None:
+            return self._submit_cached(priority, fn, args, None, _deadline(deadline, timeout), tenant, retry)
+        return self._submit(priority, fn, args, None, _deadline(deadline, timeout), tenant, retry)
+
+    def _submit_cached(self, priority, fn, args, overflow, deadline, tenant, retry=None):
+        if deadline is not None or tenant is not None or retry is not None:
+            # A shared Future would also share the first caller's deadline,
+            # tenant limits and retry policy, so only plain submissions merge
+            return self._submit(priority, fn, args, overflow, deadline, tenant, retry)
+        future = self.result_cache.get_or_submit(
+            fn, args, lambda: self._submit(priority, fn, args, overflow))
+        task = future.task if future is not None else None
+        if task is not None and priority.value < task.priority.value:
+            self.set_priority(future, priority)   # a more urgent caller joined a queued task
+        return future
+
+    def _submit(self, priority, fn, args, overflow, deadline=None, tenant=None, retry=None):
+        future = Future()
+        task = Task(priority, next(self._seq), fn, args, future, time.time(), deadline, tenant)
+        task.retry = retry
+        # Encoded before taking the lock: raises for tasks that cannot be replayed
+        payload = self.wal.encode(priority.value, fn, args, deadline, tenant) if self.wal else None
+        dropped = None
+        with self.work_ready:
+            if self._queue_full():
+                if overflow == BLOCK:
+                    self.overflow_stats["blocked"] += 1
+                    if not self.not_full.wait_for(lambda: not self._queue_full(), self.submit_timeout):
+                        self.overflow_stats["timed_out"] += 1
+                        raise QueueFullError(f"queue still full after {self.submit_timeout}s")
+                elif overflow == DROP_OLDEST_LOW:
+                    dropped = self._remove_oldest_low_locked()
+                    if dropped is None:
+                        self.overflow_stats["rejected"] += 1
+                        raise QueueFullError("queue full and no LOW task to drop")
+                    self.overflow_stats["dropped"] += 1
+                elif overflow == CALLER_RUNS:
+                    self.overflow_stats["caller_runs"] += 1
+                    task = None
+                else:
+                    self.overflow_stats["rejected"] += 1
+                    if overflow is None:
+                        return None
+                    raise QueueFullError(f"queue full ({self.max_queue_size} pending)")
+
+            if task is not None:
+                future.task = task
+                if payload is not None:
+                    task.log_id = self.wal.put(payload)
+                self.tasks.push(task)
+                self._unfinished += 1
+                if priority is TaskPriority.LOW and self.overflow == DROP_OLDEST_LOW:
+                    self._track_low_locked(task)
+                self._wake_workers(1)
+
+        if dropped is not None:
+            dropped.future.cancel()
+        if task is None:
+            # CALLER_RUNS: the producer pays for its own task, which slows it down
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            return future
+
+        if self._on_submit:
+            self._emit(self._on_submit, task)
+        if task.log_id is not None:
+            self.wal.wait(task.log_id)
+        if self.autoscale:
+            self._maybe_scale_up()
+        return future
+
+    def submit_many(self, priority, fn, iterable_of_args, deadline=None, timeout=None, tenant=None,
+                    retry=None):
+        """Submit fn(*args) for every args tuple; returns the list of futures."""
+        return self.submit_batch(((priority, fn, args) for args in iterable_of_args),
+                                 deadline=deadline, timeout=timeout, tenant=tenant, retry=retry)
+
+    def submit_batch(self, items, deadline=None, timeout=None, tenant=None, retry=None):
+        """Submit (priority, fn, args) triples with a single queue-lock acquisition.
+
+        A bounded queue or a result cache falls back to one submit() per item
+        so the overflow policy and the cache still apply.
+        """
+        deadline = _deadline(deadline, timeout)
+        if self.result_cache is not None:
+            return [self._submit_cached(priority, fn, tuple(args), self.overflow, deadline, tenant, retry)
+                    for priority, fn, args in items]
+        if self.max_queue_size is not None:
+            return [self._submit(priority, fn, tuple(args), self.overflow, deadline, tenant, retry)
+                    for priority, fn, args in items]
+        now = time.time()
+        tasks = []
+        for priority, fn, args in items:
+            future = Future()
+            task = Task(priority, next(self._seq), fn, tuple(args), future, now, deadline, tenant)
+            task.retry = retry
+            future.task = task
+            tasks.append(task)
+        if tasks:
+            if self.wal is not None:
+                payloads = [self.wal.encode(t.priority.value, t.fn, t.args, deadline, tenant)
+                            for t in tasks]
+                for task, log_id in zip(tasks, self.wal.put_many(payloads)):
+                    task.log_id = log_id
+            self._enqueue_batch(tasks)
+            if self._on_submit:
+                for task in tasks:
+                    self._emit(self._on_submit, task)
+            if self.wal is not None:
+                self.wal.wait(tasks[-1].log_id)
+            if self.autoscale:
+                self._maybe_scale_up()
+        return [task.future for task in tasks]
+
+    def _enqueue_batch(self, tasks):
+        with self.work_ready:
+            self.tasks.push_many(tasks)
+            self._unfinished += len(tasks)
+            if self.overflow == DROP_OLDEST_LOW:
+                for task in tasks:
+                    if task.priority is TaskPriority.LOW:
+                        self._track_low_locked(task)
+            self._wake_workers(len(tasks))
+
+    def _wake_workers(self, n):
+        # Caller holds queue_lock; n=None wakes every worker
+        if n is None:
+            self.work_ready.notify_all()
+        else:
+            self.work_ready.notify(n)
+
+    def _queue_full(self):
+        return (self.max_queue_size is not None
+                and len(self.tasks) + self.tenants.parked >= self.max_queue_size)
+
+    def _track_low_locked(self, task):
+        fifo = self._low_fifo
+        while fifo and (fifo[0].priority is not TaskPriority.LOW or fifo[0] not in self.tasks):
+            fifo.popleft()
+        fifo.append(task)
+
+    def _remove_oldest_low_locked(self):
+        fifo = self._low_fifo
+        while fifo:
+            task = fifo.popleft()
+            if task.priority is TaskPriority.LOW and self.tasks.remove(task):
+                task.future.task = None
+                self._task_finished_locked(task)
+                return task
+        return None
+
+    # ---------------- queue edits ----------------
+    def cancel(self, future):
+        """Cancel a pending task and drop it from the queue in O(log n).
+
+        For a task that is already running, its CancelToken is tripped instead
+        (cooperative) and False is returned.
+        """
+        task = future.task
+        if task is None:
+            return False
+        if future.running():
+            if task.token is not None:
+                task.token.cancel()
+            return False
+        if not future.cancel():
+            return False
+        with self.work_ready:
+            if self.tasks.remove(task) or self.tenants.remove(task):
+                future.task = None
+                self._task_finished_locked(task)
+                self.not_full.notify()
+        return True
+
+    def set_priority(self, future, priority):
+        """Move a still-pending task to another TaskPriority in O(log n)."""
+        task = future.task
+        if task is None:
+            return False
+        with self.work_ready:
+            if task in self.tenants:
+                task.priority = priority
+                return self.tenants.update(task)
+            if task not in self.tasks:
+                return False
+            task.priority = priority
+            if priority is TaskPriority.LOW and self.overflow == DROP_OLDEST_LOW:
+                self._track_low_locked(task)
+            return self.tasks.update(task)
+
+    def clear_queue(self):
+        """Drop every pending task. Returns how many were dropped."""
+        with self.work_ready:
+            dropped = list(self.tasks.clear()) + self.tenants.clear()
+            self._low_fifo.clear()
+            self._unfinished -= len(dropped)
+            if self.wal is not None:
+                for task in dropped:
+                    self.wal.ack(task.log_id)
+            self.all_done.notify_all()
+            self.not_full.notify_all()
+        # Cancelling the futures happens outside the lock
+        for task in dropped:
+            task.future.task = None
+            task.future.cancel()
+        return len(dropped)
 
-    def submit(self, priority, fn, *args):
-        self.tasks.put((priority.value, fn, args))
+    # ---------------- hooks ----------------
+    def add_hook(self, event, fn):
+        """Call fn on every event in HOOK_EVENTS:
+
+        submit(task)                      after the task is queued
+        dequeue(task)                     when a worker takes it off the queue
+        start(task)                       on the thread about to run it
+        finish(task, ok, value, duration) after it ran, before its future resolves
+        error(task, exception)            after finish, when it raised
+
+        Hooks run on pool threads without any pool lock held; keep them cheap.
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError(f"unknown hook event: {event!r} (choose from {HOOK_EVENTS})")
+        name = "_on_" + event
+        with self.lock:
+            setattr(self, name, getattr(self, name) + (fn,))
+
+    def remove_hook(self, event, fn):
+        name = "_on_" + event
+        with self.lock:
+            hooks = list(getattr(self, name))
+            if fn in hooks:
+                hooks.remove(fn)
+                setattr(self, name, tuple(hooks))
+
+    def _emit(self, hooks, *args):
+        for hook in hooks:
+            try:
+                hook(*args)
+            except Exception as e:
+                print("Hook error:", e)
+
+    def _replay(self):
+        # Re-queue tasks the WAL still had pending; they keep their log ids
+        from wal import resolve
+        tasks = []
+        now = time.time()
+        for log_id, payload in self.wal.recovered():
+            priority, name, args, deadline, tenant = self.wal.decode(payload)
+            fn = resolve(name)
+            if fn is None:
+                print("Task error:", f"cannot replay {name}: not found")
+                self.wal.ack(log_id)
+                continue
+            future = Future()
+            task = Task(TaskPriority(priority), next(self._seq), fn, args, future, now, deadline, tenant)
+            task.log_id = log_id
+            future.task = task
+            tasks.append(task)
+        if tasks:
+            self._enqueue_batch(tasks)
+        self.recovered = [task.future for task in tasks]
+
+    # ---------------- tenants ----------------
+    def set_tenant_limit(self, tenant, rate=None, burst=None, max_concurrent=None):
+        """Limit tenant to rate tasks/s (token bucket, bursts of burst tasks,
+        default max(1, rate)) and max_concurrent running tasks; None lifts a limit."""
+        with self.work_ready:
+            self.tenants.set_limit(tenant, rate, burst, max_concurrent)
+            self._wake_workers(None)
+
+    def tenant_stats(self):
+        """{tenant: {queued, parked, running, dispatched, throttled_rate, ...}}"""
+        with self.queue_lock:
+            stats = self.tenants.snapshot()
+            queued = collections.Counter(t.tenant for t in self.tasks if t.tenant is not None)
+        for tenant, counters in stats.items():
+            counters["queued"] = queued.pop(tenant, 0)
+        for tenant, n in queued.items():
+            stats[tenant] = {"queued": n}
+        return stats
+
+    def _task_finished_locked(self, task):
+        # Caller holds queue_lock
+        if task.log_id is not None:
+            self.wal.ack(task.log_id)
+        self._unfinished -= 1
+        if not self._unfinished:
+            self.all_done.notify_all()
+
+    def map(self, fn, iterable, chunksize=1, priority=TaskPriority.MEDIUM, max_in_flight=None):
+        """Yield fn(item) for every item, in completion order.
+
+        The iterable is consumed lazily: at most max_in_flight chunks
+        (default 2 * num_threads) are queued or running at any time.
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be >= 1")
+        if max_in_flight is None:
+            max_in_flight = 2 * self.num_threads
+        max_in_flight = max(1, max_in_flight)
+
+        finished = queue.SimpleQueue()
+        pending = set()
+        items = iter(iterable)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    chunk = list(itertools.islice(items, chunksize))
+                    if not chunk:
+                        exhausted = True
+                        break
+                    f = self.submit(priority, _run_chunk, fn, chunk)
+                    pending.add(f)
+                    f.add_done_callback(finished.put)
+                if not pending:
+                    return
+                f = finished.get()
+                pending.discard(f)
+                yield from f.result()
+        finally:
+            # Generator closed early or a chunk failed: drop queued chunks
+            for f in pending:
+                self.cancel(f)
 
     def get_queue_items(self):
         """Return all pending tasks for UI queue viewer."""
-        return list(self.tasks.queue)
+        with self.queue_lock:
+            tasks = list(self.tasks) + list(self.tenants)
+        return [(t.priority.value, t.fn, t.args) for t in tasks]
+
+    def changes(self, since=0, top_n=20):
+        """What a dashboard needs since version since, at a cost that does
+        not grow with the queue.
+
+        Returns a dict with the new version (pass it back as since next
+        time), the TaskRecords completed after since (oldest first; missed
+        counts the ones already dropped from task_history), the first top_n
+        pending tasks as (priority, fn, args) in priority order, and the
+        counters and worker states of snapshot().
+        """
+        with self.lock:
+            version = self.task_history.total
+            completed, missed = self.task_history.since(min(since, version))
+        now = time.time()
+        return {
+            "version": version,
+            "completed": completed,
+            "missed": missed,
+            "top": [(t.priority.value, t.fn, t.args) for t in self._top_pending(top_n)],
+            "queue_size": self.queue_size(),
+            "active_tasks": self.active_tasks,
+            "completed_tasks": self.completed_tasks,
+            "succeeded_tasks": self.succeeded_tasks,
+            "failed_tasks": self.failed_tasks,
+            "paused": self.paused,
+            "workers": [slot.snapshot(now) for slot in list(self.workers.values())],
+        }
+
+    def _top_pending(self, n):
+        with self.queue_lock:
+            top = getattr(self.tasks, "top", None)
+            if top is not None:
+                return top(n)
+            return heapq.nsmallest(n, self.tasks, key=lambda t: t.key)
+
+    def _register_slot(self):
+        slot = WorkerSlot(next(self._worker_ids), threading.current_thread().name)
+        self.workers[slot.worker_id] = slot
+        return slot
 
     def worker(self):
-        while not self.stopped:
+        slot = self._register_slot()
+        try:
+            self._worker_loop(slot)
+        finally:
+            self.workers.pop(slot.worker_id, None)
 
-            if self.paused:
-                time.sleep(0.1)
-                continue
+    def _worker_loop(self, slot):
+        while True:
+            with self.work_ready:
+                idle_since = time.time()
+                while not self._dispatchable_locked():
+                    if self.stopped and not self.tenants.parked and not self._retrying:
+                        return            # stopped and drained
+                    self._idle_workers += 1
+                    woke = self.work_ready.wait(self._idle_timeout_locked(idle_since))
+                    self._idle_workers -= 1
+                    if woke:
+                        idle_since = time.time()
+                    elif (self.autoscale and time.time() >= idle_since + self.keep_alive
+                          and self._retire_idle_worker()):
+                        return
 
-            try:
-                priority, fn, args = self.tasks.get(timeout=0.2)
-            except queue.Empty:
-                continue
+                # Process backend: ship up to batch_size tasks in one round trip,
+                # but leave a fair share of a burst for the other workers
+                limit = self.batch_size
+                if limit > 1:
+                    limit = max(1, min(limit, -(-len(self.tasks) // max(1, self.num_threads))))
+                batch, expired = self._take_batch_locked(limit)
 
-            start_time = time.time()
+            if expired:
+                self._expire(expired)
+            if batch:
+                self._run_batch(batch, slot)
 
-            with self.lock:
-                self.active_tasks += 1
-                self.progress = 0
-                self.current_task = (priority, args)
+    def _dispatchable_locked(self):
+        # Caller holds queue_lock. Shutdown overrides pause so the queue is drained
+        if self.paused and not self.stopped:
+            return False
+        return bool(self.tasks) or (self.tenants.parked and self.tenants.ready(time.time()))
 
-            # --- EXECUTE TASK WITH PROGRESS SIMULATION ---
-            try:
-                # Task  run normally
-                fn(*args)
-            except Exception as e:
-                print("Task error:", e)
+    def _throttle_timeout_locked(self):
+        # Caller holds queue_lock. Seconds until a rate-limited tenant gets a token
+        if not self.tenants.parked or (self.paused and not self.stopped):
+            return None
+        now = time.time()
+        ready_at = self.tenants.next_ready_at(now)
+        return None if ready_at is None else max(0.0, ready_at - now)
 
-            end_time = time.time()
-            duration = round(end_time - start_time, 2)
+    def _idle_timeout_locked(self, idle_since):
+        timeout = self._throttle_timeout_locked()
+        if self.autoscale:
+            keep_alive = max(0.0, idle_since + self.keep_alive - time.time())
+            timeout = keep_alive if timeout is None else min(timeout, keep_alive)
+        return timeout
 
-            with self.lock:
-                self.active_tasks -= 1
+    def _take_batch_locked(self, limit):
+        # Caller holds queue_lock. Pops up to limit runnable tasks, skipping
+        # cancelled ones, collecting expired ones (resolved outside the lock)
+        # and parking tasks whose tenant is over its limit
+        batch = []
+        expired = []
+        now = time.time()
+        queued = len(self.tasks)
+        tenants = self.tenants
+        while len(batch) < limit:
+            # Parked tasks already reached the head once, so they go first
+            task = tenants.pop_ready(now) if tenants.parked else None
+            if task is None:
+                if not self.tasks:
+                    break
+                task = self.tasks.pop()
+            if task.deadline is not None and now >= task.deadline and not task.future.done():
+                task.future.task = None
+                expired.append(task)
+                self._task_finished_locked(task)
+            elif task.future.done():
+                task.future.task = None
+                self._task_finished_locked(task)
+            elif not tenants.admit(task, now):
+                pass                      # parked until its tenant has room
+            elif task.future.set_running_or_notify_cancel():
+                if task.token is None:    # a retried task keeps its token
+                    task.token = CancelToken(task.deadline)
+                batch.append(task)
+            else:
+                tenants.finished(task)
+                task.future.task = None
+                self._task_finished_locked(task)
+        if self.max_queue_size is not None:
+            self.not_full.notify(queued - len(self.tasks))
+        return batch, expired
+
+    def _expire(self, expired):
+        with self.lock:
+            for task in expired:
+                self.deadline_misses[task.priority] += 1
+        for task in expired:
+            task.future.set_exception(DeadlineExceeded("deadline passed before the task started"))
+
+    def _run_batch(self, batch, slot):
+        first = batch[0]
+        start_time = time.time()
+        if self.autoscale:
+            self._maybe_scale_up(start_time - first.submitted)
+
+        with self.lock:
+            self.active_tasks += len(batch)
+        if self._on_dequeue:
+            for task in batch:
+                self._emit(self._on_dequeue, task)
+
+        # --- EXECUTE TASK (progress is reported through current_handle()) ---
+        if self.backend is None:
+            outcomes = []
+            for task in batch:
+                slot.begin(task.priority, task.args[0] if task.args else None, task.token)
+                if self._on_start:
+                    self._emit(self._on_start, task)
+                t0 = time.perf_counter()
+                try:
+                    # Task  run normally
+                    outcomes.append((True, task.fn(*task.args), time.perf_counter() - t0))
+                except Exception as e:
+                    outcomes.append((False, e, time.perf_counter() - t0))
+                slot.end()
+        else:
+            slot.begin(first.priority, first.args[0] if first.args else None)
+            if self._on_start:
+                for task in batch:
+                    self._emit(self._on_start, task)
+            outcomes = self.backend.run_batch([(task.fn, task.args) for task in batch])
+            slot.end()
+
+        for task, (ok, value, duration) in zip(batch, outcomes):
+            self._finish_task(task, ok, value, start_time, duration)
+
+    def _finish_task(self, task, ok, value, start_time, duration):
+        late = task.deadline is not None and time.time() > task.deadline
+        task.attempts += 1
+        if self._on_finish:
+            self._emit(self._on_finish, task, ok, value, duration)
+        if not ok and self._on_error:
+            self._emit(self._on_error, task, value)
+        delay = None if ok else self._retry_delay(task, value)
+        if delay is not None:
+            print("Task error:", value, f"(attempt {task.attempts}, retrying in {delay:.3f}s)")
+        elif ok:
+            task.future.task = None
+            task.future.set_result(value)
+        else:
+            print("Task error:", value)
+            task.future.task = None
+            self.dead_letters.add(task, value)
+            task.future.set_exception(value)
+
+        wait = max(0.0, start_time - task.submitted)
+        with self.lock:
+            self.active_tasks -= 1
+            if delay is not None:
+                self.retried_tasks += 1
+            else:
                 self.completed_tasks += 1
+                if ok:
+                    self.succeeded_tasks += 1
+                else:
+                    self.failed_tasks += 1
+                if late:
+                    self.deadline_late[task.priority] += 1
+
+            # Save history entry
+            self.task_history.append(TaskRecord(
+                task.args[0] if task.args else None,
+                task.priority.value, wait, duration, time.time(), ok))
+            self.stats.record(task.priority, wait, duration)
 
-                # Save history entry
-                self.task_history.append({
-                    "value": args[0],
-                    "priority": priority,
-                    "duration": duration,
-                })
+        with self.work_ready:
+            if delay is None:
+                self._task_finished_locked(task)
+            else:
+                self._retrying += 1       # keeps workers alive through shutdown
+            if self.tenants.finished(task):
+                self._wake_workers(1)
+        if delay is not None:
+            self._retry_timer.call_at(time.time() + delay, self._retry_due, task)
 
-                self.current_task = None
-                self.progress = 0
+    def _retry_delay(self, task, error):
+        # Backoff before the next attempt, or None when the task should fail now
+        policy = self.retry if task.retry is None else task.retry
+        if not policy or not policy.should_retry(task.attempts, error):
+            return None
+        if task.token is not None and task.token.cancelled:
+            return None
+        delay = policy.delay(task.attempts)
+        if task.deadline is not None and time.time() + delay >= task.deadline:
+            return None
+        return delay
+
+    def _retry_due(self, task):
+        # Delay-queue thread: put the task back, unless it was cancelled meanwhile
+        token = task.token
+        if token is not None and token.cancelled:
+            if token.reason == "deadline exceeded":
+                error = DeadlineExceeded("deadline passed while waiting to retry")
+            else:
+                error = TaskCancelled(token.reason)
+            task.future.task = None
+            with self.lock:
+                self.completed_tasks += 1
+                self.failed_tasks += 1
+            task.future.set_exception(error)
+            with self.work_ready:
+                self._retrying -= 1
+                self._task_finished_locked(task)
+                if self.stopped:
+                    self._wake_workers(None)   # idle workers may exit now
+            return
+        task.submitted = time.time()
+        with self.work_ready:
+            self._retrying -= 1
+            self.tasks.push(task)
+            self._wake_workers(1)
 
-            self.tasks.task_done()
+    def retry_dead_letters(self):
+        """Submit every dead-lettered task again (fresh attempt count);
+        returns the new futures."""
+        return [self.submit(letter.priority, letter.fn, *letter.args, tenant=letter.tenant,
+                            retry=letter.retry)
+                for letter in self.dead_letters.pop_all()]
 
     def pause(self):
-        self.paused = True
+        with self.work_ready:
+            self.paused = True
 
     def resume(self):
-        self.paused = False
+        with self.work_ready:
+            self.paused = False
+            self._wake_workers(None)
 
     def shutdown(self):
         print("Graceful shutdown initiated...")
-        self.stopped = True
-        self.tasks.join()
+        with self.work_ready:
+            self.stopped = True
+            self._wake_workers(None)
+            while self._unfinished:
+                self.all_done.wait()
+        if self.backend is not None:
+            self.backend.shutdown()
+        self._retry_timer.close()
+        if self.wal is not None:
+            self.wal.close()
         print("All queued tasks completed. Stopping threads now.")
 
+    # ---------------- asyncio bridge ----------------
+    async def submit_async(self, priority, fn, *args):
+        """Await the result of fn(*args) from an asyncio event loop."""
+        from async_pool import wrap_future
+        return await wrap_future(self.submit(priority, fn, *args))
+
+    def amap(self, fn, iterable, chunksize=1, priority=TaskPriority.MEDIUM, max_in_flight=None):
+        """Async-iterator version of map(): results in completion order."""
+        from async_pool import amap
+        return amap(self, fn, iterable, chunksize, priority, max_in_flight)
+
     def queue_size(self):
-        return self.tasks.qsize()
+        return len(self.tasks) + self.tenants.parked
+
+    def snapshot(self):
+        """Counters plus every worker's live state, read without taking any lock."""
+        now = time.time()
+        return {
+            "time": now,
+            "queue_size": self.queue_size(),
+            "active_tasks": self.active_tasks,
+            "completed_tasks": self.completed_tasks,
+            "succeeded_tasks": self.succeeded_tasks,
+            "failed_tasks": self.failed_tasks,
+            "retried_tasks": self.retried_tasks,
+            "retry_pending": len(self._retry_timer),
+            "dead_letters": len(self.dead_letters),
+            "num_threads": self.num_threads,
+            "paused": self.paused,
+            "stopped": self.stopped,
+            "overflow": dict(self.overflow_stats),
+            "tenants": self.tenants.snapshot(),
+            "cache": self.result_cache.stats() if self.result_cache is not None else None,
+            "workers": [slot.snapshot(now) for slot in list(self.workers.values())],
+        }
 
 
+def _deadline(deadline, timeout):
+    if timeout is not None:
+        by_timeout = time.time() + timeout
+        deadline = by_timeout if deadline is None else min(deadline, by_timeout)
+    return deadline
 
 
+def _run_chunk(fn, items):
+    return [fn(item) for item in items]
@@ -0,0 +1,106 @@
+import collections
+import json
+import os
+import threading
+import time
+
+
+class TraceRecorder:
+    """Records per-task spans through a pool's hooks as Chrome Trace Events.
+
+    Every task becomes a "queued" async span (submit -> dequeue) and a run
+    slice on the track of the worker thread that ran it, with its queue wait
+    and run time in the slice args. Open the file written by save() in
+    Perfetto (ui.perfetto.dev) or chrome://tracing. Only the newest
+    max_events events are kept, so a recorder can stay attached.
+    """
+
+    HOOKS = ("dequeue", "start", "finish")
+
+    def __init__(self, pool=None, max_events=200_000):
+        self._events = collections.deque(maxlen=max_events)
+        self._open = {}                   # task -> dequeue time, then (dequeued, started, tid)
+        self._threads = {}                # tid -> thread name
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._pools = []
+        if pool is not None:
+            self.attach(pool)
+
+    def attach(self, pool):
+        for event in self.HOOKS:
+            pool.add_hook(event, getattr(self, "_on_" + event))
+        self._pools.append(pool)
+        return self
+
+    def detach(self, pool=None):
+        for p in [pool] if pool is not None else list(self._pools):
+            for event in self.HOOKS:
+                p.remove_hook(event, getattr(self, "_on_" + event))
+            self._pools.remove(p)
+
+    # ---------------- hooks ----------------
+    def _on_dequeue(self, task):
+        self._open[task] = time.time()
+
+    def _on_start(self, task):
+        thread = threading.current_thread()
+        now = time.time()
+        self._open[task] = (self._open.get(task, now), now, thread.ident)
+        if thread.ident not in self._threads:
+            self._threads[thread.ident] = thread.name
+
+    def _on_finish(self, task, ok, value, duration):
+        end = time.time()
+        opened = self._open.pop(task, None)
+        if not isinstance(opened, tuple):
+            return
+        dequeued, started, tid = opened
+        name = getattr(task.fn, "__name__", repr(task.fn))
+        priority = task.priority.name
+        span = task.seq
+        args = {
+            "priority": priority,
+            "wait_ms": round((started - task.submitted) * 1e3, 3),
+            "run_ms": round(duration * 1e3, 3),
+            "ok": ok,
+        }
+        if task.args:
+            args["value"] = repr(task.args[0])[:80]
+        if task.tenant is not None:
+            args["tenant"] = str(task.tenant)
+        if not ok:
+            args["error"] = repr(value)[:200]
+        with self._lock:
+            self._events.append({"name": priority, "cat": "queue", "ph": "b", "id": span,
+                                 "pid": self._pid, "tid": 0, "ts": _us(task.submitted)})
+            self._events.append({"name": priority, "cat": "queue", "ph": "e", "id": span,
+                                 "pid": self._pid, "tid": 0, "ts": _us(dequeued)})
+            self._events.append({"name": name, "cat": "task", "ph": "X", "pid": self._pid,
+                                 "tid": tid, "ts": _us(started), "dur": _us(end - started),
+                                 "args": args})
+
+    # ---------------- output ----------------
+    def events(self):
+        """Trace events recorded so far, plus thread-name metadata."""
+        with self._lock:
+            events = list(self._events)
+        meta = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                 "args": {"name": name}} for tid, name in list(self._threads.items())]
+        meta.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": 0,
+                     "args": {"name": "queue"}})
+        return meta + events
+
+    def save(self, path):
+        """Write Chrome Trace Event JSON to path."""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+        return path
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+
+def _us(seconds):
+    return round(seconds * 1e6, 1)
@@ -1,11 +1,5 @@
 
 # Put this file in your project and rus     main.py
-import ctypes
-try:
-    ctypes.windll.shcore.SetProcessDpiAwareness(1)
-except Exception:
-    pass
-
 import tkinter as tk
 from tkinter import ttk, messagebox
 from thread_pool import TaskPriority
@@ -25,19 +19,56 @@ except Exception:
     def play_sound():
         pass
 
-# optional graphing
-HAS_MPL = True
-try:
-    import matplotlib
-    matplotlib.use("TkAgg")
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.figure import Figure
-except Exception:
-    HAS_MPL = False
+class _SoundPlayer:
+    """One daemon thread that beeps for completions; completions that arrive
+    while a beep is playing or within min_interval collapse into one beep."""
+
+    def __init__(self, play=play_sound, min_interval=0.25):
+        self.play = play
+        self.min_interval = min_interval
+        self._pending = threading.Event()
+        threading.Thread(target=self._run, name="ui-sound", daemon=True).start()
+
+    def notify(self):
+        self._pending.set()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            self.play()
+            time.sleep(self.min_interval)
+
+
+def _enable_dpi_awareness():
+    # Sharp text on high-DPI Windows screens; done here, not at import time
+    try:
+        import ctypes
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    except Exception:
+        pass
+
+
+def _load_matplotlib():
+    # optional graphing: (Figure, FigureCanvasTkAgg), or None without matplotlib
+    try:
+        import matplotlib
+        matplotlib.use("TkAgg")
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+    except Exception:
+        return None
+    return Figure, FigureCanvasTkAgg
 
 class ThreadUI:
+    QUEUE_ROWS = 50                   # pending tasks shown; the rest is only counted
+    HISTORY_ROWS = 50
+    GRAPH_SAMPLES = 40
+
     def __init__(self, pool):
         self.pool = pool
+        _enable_dpi_awareness()
+        self.mpl = _load_matplotlib()
         self.root = tk.Tk()
         self.root.title("Thread Manager — Pro")
         self.root.geometry("800x850")
@@ -54,9 +85,15 @@ class ThreadUI:
         self._build_layout()
         self._bind_hover_effects()
 
-        # graph data
+        # incremental refresh state: pool.changes() version, last queue rows,
+        # graph samples and y-limit (the background is only redrawn when it changes)
+        self._version = 0
+        self._queue_lines = None
+        self._history_lines = 0
         self.queue_history = []
-        self.history_t = []
+        self._graph_top = None
+        self._graph_bg = None
+        self.sound = _SoundPlayer()
 
         # start UI update loop
         self.update_ui()
@@ -196,7 +233,8 @@ class ThreadUI:
         self.history_view.pack()
 
         # right: graph (if mpl available)
-        if HAS_MPL:
+        if self.mpl:
+            Figure, FigureCanvasTkAgg = self.mpl
             graph_frame = ttk.Frame(bottom)
             graph_frame.grid(row=0, column=1, sticky="nsew")
             self.fig = Figure(figsize=(3,1.6), dpi=80)
@@ -204,9 +242,11 @@ class ThreadUI:
             self.ax.set_title("Queue Size (recent)")
             self.ax.set_ylabel("size")
             self.ax.set_xlabel("samples")
-            self.line, = self.ax.plot([], [], lw=1.5)
+            self.ax.set_xlim(0, self.GRAPH_SAMPLES - 1)
+            self.line, = self.ax.plot([], [], lw=1.5, color="#66c2a5", animated=True)
             self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
             self.canvas.get_tk_widget().pack()
+            self.canvas.mpl_connect("draw_event", self._on_graph_draw)
         else:
             ttk.Label(bottom, text="Matplotlib not installed: Graph disabled", style="Small.TLabel").grid(row=0, column=1)
 
@@ -252,22 +292,17 @@ class ThreadUI:
 
     def batch_add(self, n=10):
         from tasks import simulated_heavy_task
+        batch = []
         for i in range(n):
             name = f"batch-{int(time.time()*1000)%10000}-{i}"
             pr = random.choice([TaskPriority.HIGH, TaskPriority.MEDIUM, TaskPriority.LOW])
-            self.pool.submit(pr, simulated_heavy_task, name)
+            batch.append((pr, simulated_heavy_task, (name,)))
+        self.pool.submit_batch(batch)
+        for pr, _, (name,) in batch:
             self._log(f"[{pr.name}] Task Added : {name}")
 
     def clear_queue(self):
-        # Drain internal priority queue (demo-friendly)
-        drained = 0
-        try:
-            while True:
-                item = self.pool.tasks.get_nowait()
-                self.pool.tasks.task_done()
-                drained += 1
-        except Exception:
-            pass
+        drained = self.pool.clear_queue()
         self._log(f"Cleared {drained} pending tasks from queue.")
 
     def toggle_theme(self):
@@ -313,20 +348,33 @@ class ThreadUI:
 
     # ---------------- UI updater ----------------
     def update_ui(self):
+        # One pool.changes() call per tick: counters, the top QUEUE_ROWS
+        # pending tasks and only the completions since the last tick, so the
+        # cost stays flat however long the queue grows.
+        try:
+            changes = self.pool.changes(self._version, top_n=self.QUEUE_ROWS)
+        except Exception:
+            self.root.after(300, self.update_ui)
+            return
+        self._version = changes["version"]
+
         # cards
         try:
-            self.active_card.winfo_children()[1].config(text=str(self.pool.active_tasks))
-            self.queue_card.winfo_children()[1].config(text=str(self.pool.queue_size()))
-            self.done_card.winfo_children()[1].config(text=str(self.pool.completed_tasks))
+            self.active_card.winfo_children()[1].config(text=str(changes["active_tasks"]))
+            self.queue_card.winfo_children()[1].config(text=str(changes["queue_size"]))
+            self.done_card.winfo_children()[1].config(text=str(changes["completed_tasks"]))
         except Exception:
             pass
 
-        # currently executing
-        if getattr(self.pool, "current_task", None):
-            pr, args = self.pool.current_task
-            val = args[0]
-            pr_name = TaskPriority(pr).name if not isinstance(pr, TaskPriority) else pr.name
-            self.current_label.config(text=f"Currently Executing: {val} ({pr_name})")
+        # currently executing: one entry per busy worker
+        busy = [w for w in changes["workers"] if w["busy"]]
+        if busy:
+            parts = []
+            for w in busy[:3]:
+                pct = f" {w['progress']:.0f}%" if w["progress"] is not None else ""
+                parts.append(f"{w['value']} ({w['priority'].name}{pct})")
+            more = f" +{len(busy) - 3} more" if len(busy) > 3 else ""
+            self.current_label.config(text="Currently Executing: " + ", ".join(parts) + more)
             # show progress bar indeterminate
             try:
                 if not getattr(self, "_progress_running", False):
@@ -343,66 +391,82 @@ class ThreadUI:
             except Exception:
                 pass
 
-        # queue viewer
-        try:
-            items = self.pool.get_queue_items()
-            self.queue_view.config(state='normal')
-            self.queue_view.delete("1.0", tk.END)
-            for priority, fn, args in items:
-                pr_name = TaskPriority(priority).name if not isinstance(priority, TaskPriority) else priority.name
-                self.queue_view.insert(tk.END, f"{args[0]} ({pr_name})\n")
-            self.queue_view.config(state='disabled')
-        except Exception:
-            pass
-
-        # history viewer: show recent items from pool.task_history
-        try:
-            hist = getattr(self.pool, "task_history", [])
-            self.history_view.config(state='normal')
-            self.history_view.delete("1.0", tk.END)
-            for rec in hist[-50:]:
-                pr = rec["priority"]
-                pr_name = pr.name if isinstance(pr, TaskPriority) else TaskPriority(pr).name
-                line = f"{rec['value']} - {pr_name} - {rec['duration']}s\n"
-                self.history_view.insert(tk.END, line)
-            self.history_view.config(state='disabled')
-        except Exception:
-            pass
+        self._update_queue_view(changes["top"], changes["queue_size"])
+        self._update_history_view(changes["completed"])
 
-        # play sound on newly completed task detection
-        try:
-            completed = getattr(self, "_last_completed", 0)
-            now_completed = self.pool.completed_tasks
-            if now_completed > completed:
-                # play sound for each new completed
-                for _ in range(now_completed - completed):
-                    threading.Thread(target=play_sound, daemon=True).start()
-                self._last_completed = now_completed
-        except Exception:
-            self._last_completed = getattr(self.pool, "completed_tasks", 0)
+        # one (coalesced) beep for everything completed since the last tick
+        if changes["completed"] or changes["missed"]:
+            self.sound.notify()
 
-        # graph update
-        try:
-            if HAS_MPL:
-                qsize = self.pool.queue_size()
-                self.queue_history.append(qsize)
-                self.history_t.append(time.time())
-                # keep last 40 samples
-                self.queue_history = self.queue_history[-40:]
-                self.history_t = self.history_t[-40:]
-                self.ax = self.fig.axes[0]
-                self.ax.clear()
-                self.ax.plot(self.queue_history, color="#66c2a5")
-                self.ax.set_title("Queue size (recent)")
-                self.ax.set_ylim(0, max(5, max(self.queue_history)+1))
-                self.canvas.draw()
-        except Exception:
-            pass
+        self._update_graph(changes["queue_size"])
 
         # schedule next update
         self.root.after(300, self.update_ui)
 
-
-
-
-
+    def _update_queue_view(self, top, total):
+        # Only the first QUEUE_ROWS tasks are rendered, and only when they changed
+        lines = []
+        for priority, fn, args in top:
+            pr_name = TaskPriority(priority).name if not isinstance(priority, TaskPriority) else priority.name
+            lines.append(f"{args[0] if args else getattr(fn, '__name__', fn)} ({pr_name})")
+        if total > len(lines):
+            lines.append(f"... and {total - len(lines)} more")
+        if lines == self._queue_lines:
+            return
+        self._queue_lines = lines
+        self.queue_view.config(state='normal')
+        self.queue_view.delete("1.0", tk.END)
+        if lines:
+            self.queue_view.insert(tk.END, "\n".join(lines) + "\n")
+        self.queue_view.config(state='disabled')
+
+    def _update_history_view(self, records):
+        # Append the new completions and trim the oldest lines past HISTORY_ROWS
+        if not records:
+            return
+        records = records[-self.HISTORY_ROWS:]
+        lines = []
+        for rec in records:
+            pr = rec.priority
+            pr_name = pr.name if isinstance(pr, TaskPriority) else TaskPriority(pr).name
+            lines.append(f"{rec.value} - {pr_name} - {rec.duration:.2f}s\n")
+        self.history_view.config(state='normal')
+        self.history_view.insert(tk.END, "".join(lines))
+        self._history_lines += len(lines)
+        extra = self._history_lines - self.HISTORY_ROWS
+        if extra > 0:
+            self.history_view.delete("1.0", f"{extra + 1}.0")
+            self._history_lines -= extra
+        self.history_view.see(tk.END)
+        self.history_view.config(state='disabled')
+
+    # ---------------- graph ----------------
+    def _on_graph_draw(self, event):
+        # After a full draw, keep the background to blit the line onto
+        self._graph_bg = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def _update_graph(self, qsize):
+        if not self.mpl:
+            return
+        try:
+            self.queue_history.append(qsize)
+            del self.queue_history[:-self.GRAPH_SAMPLES]
+            self.line.set_data(range(len(self.queue_history)), self.queue_history)
+
+            # The y-limit moves in powers of two, so the axes (and the cached
+            # background) are redrawn rarely; every other tick only blits the line
+            peak = max(self.queue_history)
+            top = self._graph_top
+            if top is None or peak > top or peak < top / 4:
+                top = max(5, 2 ** max(peak, 1).bit_length())
+            if top != self._graph_top or self._graph_bg is None:
+                self._graph_top = top
+                self.ax.set_ylim(0, top)
+                self.canvas.draw()        # full redraw; _on_graph_draw re-captures
+            else:
+                self.canvas.restore_region(self._graph_bg)
+                self.ax.draw_artist(self.line)
+                self.canvas.blit(self.ax.bbox)
+        except Exception:
+            pass
@@ -0,0 +1,240 @@
+import importlib
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+
+# Record framing: length, crc32 of (kind, id, payload), kind, task id, payload
+_HEADER = struct.Struct("<IIBQ")
+PUT = 1
+ACK = 2
+
+_registry = {}
+
+
+def register(fn=None, name=None):
+    """Register fn for replay under name (default "module.qualname").
+
+    Usable as a decorator. Module-level functions need no registration: they
+    are found again by importing their module.
+    """
+    if fn is None:
+        return lambda fn: register(fn, name)
+    _registry[name or task_name(fn)] = fn
+    return fn
+
+
+def task_name(fn):
+    """Name a task function is logged under, e.g. "tasks.simulated_heavy_task"."""
+    for name, registered in _registry.items():
+        if registered is fn:
+            return name
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    if resolve(name) is not fn:
+        raise ValueError(f"{fn!r} cannot be found again by name; use wal.register()")
+    return name
+
+
+def resolve(name):
+    """The function logged as name, or None when it cannot be found."""
+    fn = _registry.get(name)
+    if fn is not None:
+        return fn
+    module, _, qualname = name.rpartition(".")
+    if not module:
+        return None
+    try:
+        obj = importlib.import_module(module)
+    except ImportError:
+        # Nested qualname such as "module.Class.method"
+        module, _, outer = module.rpartition(".")
+        if not module:
+            return None
+        try:
+            obj = importlib.import_module(module)
+        except (ImportError, ValueError):
+            return None
+        qualname = f"{outer}.{qualname}"
+    for part in qualname.split("."):
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return None
+    return obj
+
+
+class WriteAheadLog:
+    """Append-only log of pending tasks with group-commit fsync.
+
+    put() buffers a record and returns its id at once; wait(id) blocks until
+    the record is on disk. One writer thread flushes everything buffered so
+    far with a single write + fsync, so concurrent submitters share the cost
+    of each fsync. ack() marks a task finished; acks are not waited for, so
+    a crash can replay a task that had already run (at-least-once).
+
+    Once the file is more than twice the size of the live (unacked) records
+    and at least compact_bytes long, it is rewritten with only the live ones.
+    Opening an existing log keeps its pending tasks for recovered().
+    """
+
+    def __init__(self, path, fsync=True, compact_bytes=1 << 20):
+        self.path = path
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._has_work = threading.Condition(self._lock)
+        self._buffer = []
+        self._pending = {}                # id -> framed PUT record
+        self._live_bytes = 0
+        self._durable_id = 0
+        self._buffered_id = 0
+        self._closed = False
+        self._file = None
+        self._size = 0
+        self.fsyncs = 0
+        self.compactions = 0
+
+        self._load()
+        self._recovered = sorted(self._pending)
+        self._next_id = max(self._pending, default=0) + 1
+        self._compact()
+
+        self._writer = threading.Thread(target=self._write_loop, name="wal-writer", daemon=True)
+        self._writer.start()
+
+    # ---------------- records ----------------
+    @staticmethod
+    def encode(priority, fn, args, deadline=None, tenant=None):
+        """Payload for put(). Raises ValueError/PicklingError for tasks that cannot be replayed."""
+        return pickle.dumps((priority, task_name(fn), args, deadline, tenant),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(payload):
+        """(priority value, fn name, args, deadline, tenant)"""
+        return pickle.loads(payload)
+
+    @staticmethod
+    def _frame(kind, task_id, payload=b""):
+        body = struct.pack("<BQ", kind, task_id) + payload
+        return _HEADER.pack(len(payload), zlib.crc32(body), kind, task_id) + payload
+
+    def _load(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            data = f.read()
+        pos = 0
+        while pos + _HEADER.size <= len(data):
+            length, crc, kind, task_id = _HEADER.unpack_from(data, pos)
+            end = pos + _HEADER.size + length
+            payload = data[pos + _HEADER.size:end]
+            if len(payload) < length or zlib.crc32(struct.pack("<BQ", kind, task_id) + payload) != crc:
+                break                     # torn write at the tail of the log
+            if kind == PUT:
+                # A compaction can leave a second copy of a PUT that was still buffered
+                self._live_bytes -= len(self._pending.get(task_id, b""))
+                self._pending[task_id] = data[pos:end]
+                self._live_bytes += end - pos
+            elif kind == ACK and task_id in self._pending:
+                self._live_bytes -= len(self._pending.pop(task_id))
+            pos = end
+
+    # ---------------- API ----------------
+    def recovered(self):
+        """[(id, payload)] of tasks still pending when the log was opened, oldest first."""
+        with self._lock:
+            return [(i, self._pending[i][_HEADER.size:]) for i in self._recovered if i in self._pending]
+
+    def put(self, payload):
+        return self.put_many([payload])[0]
+
+    def put_many(self, payloads):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write-ahead log is closed")
+            ids = []
+            for payload in payloads:
+                task_id = self._next_id
+                self._next_id += 1
+                record = self._frame(PUT, task_id, payload)
+                self._pending[task_id] = record
+                self._live_bytes += len(record)
+                self._buffer.append(record)
+                ids.append(task_id)
+            self._buffered_id = task_id if ids else self._buffered_id
+            self._has_work.notify()
+        return ids
+
+    def ack(self, task_id):
+        with self._lock:
+            record = self._pending.pop(task_id, None)
+            if record is None or self._closed:
+                return
+            self._live_bytes -= len(record)
+            self._buffer.append(self._frame(ACK, task_id))
+            self._has_work.notify()
+
+    def wait(self, task_id):
+        """Block until the PUT for task_id (and everything before it) is durable."""
+        with self._flushed:
+            while self._durable_id < task_id and not self._closed:
+                self._flushed.wait()
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def close(self):
+        """Flush what is buffered and stop the writer thread."""
+        with self._lock:
+            self._closed = True
+            self._has_work.notify()
+        self._writer.join()
+        self._file.close()
+
+    # ---------------- writer ----------------
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                while not self._buffer and not self._closed:
+                    self._has_work.wait()
+                batch, self._buffer = self._buffer, []
+                upto = self._buffered_id
+                closed = self._closed
+            if batch:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                    self.fsyncs += 1
+                self._size += sum(len(r) for r in batch)
+            with self._lock:
+                self._durable_id = upto
+                self._flushed.notify_all()
+                compact = (self._size >= self.compact_bytes
+                           and self._size > 2 * self._live_bytes)
+            if compact:
+                self._compact()
+            if closed:
+                return
+
+    def _compact(self):
+        # Rewrite the log with only the live PUT records. Runs before the
+        # writer starts or on the writer thread, so nothing else writes the file
+        with self._lock:
+            live = list(self._pending.values())
+        tmp = self.path + ".compact"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(live))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if self._file is not None:
+            self._file.close()
+            self.compactions += 1
+        self._file = open(self.path, "ab")
+        self._size = sum(len(r) for r in live)
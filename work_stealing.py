@@ -0,0 +1,314 @@
+import collections
+import random
+import threading
+import time
+
+from cancellation import CancelToken, DeadlineExceeded
+from futures import Future
+from task_queue import Task
+from task_stats import TaskRecord, TaskStats
+from thread_pool import ThreadPool, TaskPriority
+
+
+_PRIORITIES = sorted(TaskPriority, key=lambda p: p.value)
+_tls = threading.local()
+
+
+class _WorkerQueues:
+    """One deque per TaskPriority plus per-worker counters (owner writes only)."""
+
+    __slots__ = ("deques", "completed", "failed", "active", "stats", "missed", "late")
+
+    def __init__(self):
+        self.deques = tuple(collections.deque() for _ in _PRIORITIES)
+        self.completed = 0
+        self.failed = 0
+        self.active = 0
+        self.stats = TaskStats(TaskPriority)
+        self.missed = {p: 0 for p in TaskPriority}   # deadline passed while queued
+        self.late = {p: 0 for p in TaskPriority}     # finished after the deadline
+
+
+class WorkStealingPool(ThreadPool):
+    """ThreadPool variant without a shared queue lock on the hot path.
+
+    Tasks submitted from outside go to a shared injector; tasks submitted
+    from inside a running task go to that worker's own deque (LIFO for the
+    owner, FIFO for thieves). A worker looks for the highest TaskPriority
+    first in its own deque, then the injector, then other workers' deques,
+    before moving down to the next priority. deque append/pop are atomic in
+    CPython, so only idle parking takes a lock. Counters are kept per
+    worker and summed on read; task_history is appended without a lock,
+    so under contention it may occasionally lose an entry.
+
+    Fixed worker count and thread backend only; set_priority() is not
+    supported, cancel() is lazy (the task is skipped when dequeued),
+    tenant limits are not enforced (tasks only record their tenant) and
+    failed tasks are not retried or dead-lettered.
+    """
+
+    def __init__(self, num_threads=6):
+        self._locals = []
+        self._injector = _WorkerQueues()
+        super().__init__(num_threads=num_threads)
+
+    # Counters live in the per-worker records and are summed on read
+    @property
+    def completed_tasks(self):
+        return sum(q.completed for q in self._locals)
+
+    @completed_tasks.setter
+    def completed_tasks(self, value):
+        pass
+
+    @property
+    def active_tasks(self):
+        return sum(q.active for q in self._locals)
+
+    @active_tasks.setter
+    def active_tasks(self, value):
+        pass
+
+    @property
+    def succeeded_tasks(self):
+        return sum(q.completed - q.failed for q in self._locals)
+
+    @succeeded_tasks.setter
+    def succeeded_tasks(self, value):
+        pass
+
+    @property
+    def failed_tasks(self):
+        return sum(q.failed for q in self._locals)
+
+    @failed_tasks.setter
+    def failed_tasks(self, value):
+        pass
+
+    @property
+    def deadline_misses(self):
+        return self._sum_by_priority("missed")
+
+    @deadline_misses.setter
+    def deadline_misses(self, value):
+        pass
+
+    @property
+    def deadline_late(self):
+        return self._sum_by_priority("late")
+
+    @deadline_late.setter
+    def deadline_late(self, value):
+        pass
+
+    def _sum_by_priority(self, name):
+        totals = {p: 0 for p in TaskPriority}
+        for q in self._locals:
+            for p, n in list(getattr(q, name).items()):
+                totals[p] += n
+        return totals
+
+    @property
+    def stats(self):
+        merged = TaskStats(TaskPriority)
+        for q in self._locals:
+            merged.merge(q.stats)
+        return merged
+
+    @stats.setter
+    def stats(self, value):
+        pass
+
+    def _spawn_worker(self):
+        # Caller holds self.lock
+        queues = _WorkerQueues()
+        self._locals.append(queues)
+        t = threading.Thread(target=self.worker, args=(queues,), daemon=True)
+        self.threads.append(t)
+        self.num_threads += 1
+        self.workers_started += 1
+        t.start()
+
+    # ---------------- submit ----------------
+    def _submit(self, priority, fn, args, overflow, deadline=None, tenant=None, retry=None):
+        future = Future()
+        task = Task(priority, next(self._seq), fn, args, future, time.time(), deadline, tenant)
+        future.task = task
+        owner = getattr(_tls, "owner", None)
+        queues = owner[1] if owner is not None and owner[0] is self else self._injector
+        queues.deques[priority.value - 1].append(task)
+        if self._idle_workers:
+            with self.work_ready:
+                self.work_ready.notify()
+        if self._on_submit:
+            self._emit(self._on_submit, task)
+        return future
+
+    def _enqueue_batch(self, tasks):
+        owner = getattr(_tls, "owner", None)
+        queues = owner[1] if owner is not None and owner[0] is self else self._injector
+        for task in tasks:
+            queues.deques[task.priority.value - 1].append(task)
+        if self._idle_workers:
+            with self.work_ready:
+                self.work_ready.notify(len(tasks))
+
+    def cancel(self, future):
+        task = future.task
+        if future.running() and task is not None and task.token is not None:
+            task.token.cancel()
+            return False
+        return future.cancel()
+
+    def set_priority(self, future, priority):
+        return False
+
+    def clear_queue(self):
+        dropped = 0
+        for queues in [self._injector] + self._locals:
+            for dq in queues.deques:
+                while True:
+                    try:
+                        task = dq.popleft()
+                    except IndexError:
+                        break
+                    task.future.task = None
+                    task.future.cancel()
+                    dropped += 1
+        return dropped
+
+    def queue_size(self):
+        return sum(len(dq) for q in [self._injector] + self._locals for dq in q.deques)
+
+    def get_queue_items(self):
+        return [(t.priority.value, t.fn, t.args)
+                for q in [self._injector] + self._locals for dq in q.deques for t in list(dq)]
+
+    def _top_pending(self, n):
+        # Highest priority first; within a level the injector, then workers' deques
+        out = []
+        for level in range(len(_PRIORITIES)):
+            for q in [self._injector] + self._locals:
+                dq = q.deques[level]
+                try:
+                    # indexing near the left end is cheap and does not copy the deque
+                    out.extend(dq[i] for i in range(min(n - len(out), len(dq))))
+                except IndexError:
+                    pass                  # popped meanwhile
+                if len(out) >= n:
+                    return out
+        return out
+
+    # ---------------- scheduling ----------------
+    def _find_task(self, own):
+        others = self._locals
+        n = len(others)
+        start = random.randrange(n) if n else 0
+        for level in range(len(_PRIORITIES)):
+            try:
+                return own.deques[level].pop()
+            except IndexError:
+                pass
+            try:
+                return self._injector.deques[level].popleft()
+            except IndexError:
+                pass
+            for i in range(n):
+                victim = others[(start + i) % n]
+                if victim is own:
+                    continue
+                try:
+                    return victim.deques[level].popleft()
+                except IndexError:
+                    pass
+        return None
+
+    def _park(self, own):
+        with self.work_ready:
+            self._idle_workers += 1
+            try:
+                # Re-check after registering as idle: a submit that missed
+                # _idle_workers must have queued its task before this check
+                while not self.stopped and (self.paused or not self.queue_size()):
+                    self.work_ready.wait()
+            finally:
+                self._idle_workers -= 1
+
+    def worker(self, own):
+        slot = self._register_slot()
+        try:
+            self._steal_loop(own, slot)
+        finally:
+            self.workers.pop(slot.worker_id, None)
+
+    def _steal_loop(self, own, slot):
+        _tls.owner = (self, own)
+        while True:
+            task = None if self.paused and not self.stopped else self._find_task(own)
+            if task is None:
+                if self.stopped and not self.queue_size():
+                    break
+                self._park(own)
+                continue
+
+            future = task.future
+            if task.deadline is not None and time.time() >= task.deadline and not future.done():
+                own.missed[task.priority] += 1
+                future.task = None
+                future.set_exception(DeadlineExceeded("deadline passed before the task started"))
+                continue
+            if not future.set_running_or_notify_cancel():
+                future.task = None
+                continue
+
+            own.active = 1
+            task.token = CancelToken(task.deadline)
+            if self._on_dequeue:
+                self._emit(self._on_dequeue, task)
+            slot.begin(task.priority, task.args[0] if task.args else None, task.token)
+            if self._on_start:
+                self._emit(self._on_start, task)
+            start_time = time.time()
+            t0 = time.perf_counter()
+            ok = True
+            try:
+                value = task.fn(*task.args)
+            except Exception as e:
+                print("Task error:", e)
+                value = e
+                ok = False
+            duration = time.perf_counter() - t0
+            future.task = None
+            slot.end()
+            if self._on_finish:
+                self._emit(self._on_finish, task, ok, value, duration)
+            if not ok and self._on_error:
+                self._emit(self._on_error, task, value)
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+            wait = max(0.0, start_time - task.submitted)
+            own.active = 0
+            own.completed += 1
+            if not ok:
+                own.failed += 1
+            own.stats.record(task.priority, wait, duration)
+            now = time.time()
+            if task.deadline is not None and now > task.deadline:
+                own.late[task.priority] += 1
+            # No lock: an entry may be lost under contention (see class docstring)
+            self.task_history.append(TaskRecord(
+                task.args[0] if task.args else None,
+                task.priority.value, wait, duration, now, ok))
+
+    def shutdown(self):
+        print("Graceful shutdown initiated...")
+        with self.work_ready:
+            self.stopped = True
+            self.paused = False
+            self.work_ready.notify_all()
+        for t in list(self.threads):
+            if t is not threading.current_thread():
+                t.join()
+        print("All queued tasks completed. Stopping threads now.")
@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+_local = threading.local()
+
+
+def current_handle():
+    """TaskHandle of the task running in this thread, or None outside a task."""
+    return getattr(_local, "handle", None)
+
+
+class TaskHandle:
+    """Lets a running task report its own progress (0-100) and a short note.
+
+    handle.token is the task's CancelToken (see cancellation.py).
+    """
+
+    __slots__ = ("progress", "note", "token")
+
+    def __init__(self, token=None):
+        self.progress = None
+        self.note = None
+        self.token = token
+
+    def report(self, progress, note=None):
+        self.progress = progress
+        if note is not None:
+            self.note = note
+
+
+class WorkerSlot:
+    """Live state of one worker thread.
+
+    Only the owning worker writes to its slot. The running task is published
+    as one immutable tuple, so readers get a consistent view without a lock.
+    """
+
+    __slots__ = ("worker_id", "name", "current", "tasks_done")
+
+    def __init__(self, worker_id, name):
+        self.worker_id = worker_id
+        self.name = name
+        self.current = None               # (priority, value, started, handle) or None
+        self.tasks_done = 0
+
+    def begin(self, priority, value, token=None):
+        handle = TaskHandle(token)
+        self.current = (priority, value, time.time(), handle)
+        _local.handle = handle
+        return handle
+
+    def show(self, priority, value, token=None):
+        """Publish a task without binding a handle to the thread (event-loop workers)."""
+        self.current = (priority, value, time.time(), TaskHandle(token))
+
+    def end(self):
+        self.current = None
+        self.tasks_done += 1
+        _local.handle = None
+
+    def snapshot(self, now):
+        current = self.current
+        if current is None:
+            return {"id": self.worker_id, "name": self.name, "busy": False,
+                    "tasks_done": self.tasks_done}
+        priority, value, started, handle = current
+        return {
+            "id": self.worker_id,
+            "name": self.name,
+            "busy": True,
+            "priority": priority,
+            "value": value,
+            "started": started,
+            "elapsed": now - started,
+            "progress": handle.progress,
+            "note": handle.note,
+            "tasks_done": self.tasks_done,
+        }